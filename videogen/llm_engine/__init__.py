@@ -1,6 +1,6 @@
 from .client import LLMEngine, get_engine
 from .types import ChatMessage
-from .errors import LLMError, LLMHTTPError, LLMConfigError
+from .errors import LLMError, LLMHTTPError, LLMRetryableError, LLMConfigError
 
 __all__ = [
     "LLMEngine",
@@ -8,5 +8,6 @@ __all__ = [
     "ChatMessage",
     "LLMError",
     "LLMHTTPError",
+    "LLMRetryableError",
     "LLMConfigError",
 ]
\ No newline at end of file
@@ -0,0 +1,60 @@
+from __future__ import annotations
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import List, Optional
+
+from .types import ChatMessage
+
+
+class PromptCache:
+    """
+    LLM 响应的本地磁盘缓存（.cache/llm/）：
+    - key = hash(所有 message 内容 + model + temperature)
+    - 仅用于低温确定性请求（temperature <= 0.2 且非 stream）
+    - 环境变量 LLM_CACHE_DISABLE=1 可整体关闭
+    """
+
+    MAX_CACHE_TEMPERATURE = 0.2
+
+    def __init__(self, cache_dir: Optional[Path] = None):
+        self.cache_dir = Path(cache_dir or os.getenv("LLM_CACHE_DIR", ".cache/llm"))
+
+    @staticmethod
+    def enabled() -> bool:
+        return not os.getenv("LLM_CACHE_DISABLE")
+
+    def cacheable(self, *, temperature: float, stream: bool) -> bool:
+        return self.enabled() and not stream and temperature <= self.MAX_CACHE_TEMPERATURE
+
+    def _path(self, messages: List[ChatMessage], model: str, temperature: float) -> Path:
+        payload = json.dumps(
+            {
+                "messages": [(m["role"], m["content"]) for m in messages],
+                "model": model,
+                "temperature": temperature,
+            },
+            ensure_ascii=False,
+        )
+        key = hashlib.sha256(payload.encode("utf-8")).hexdigest()
+        return self.cache_dir / f"{key}.json"
+
+    def get(self, messages: List[ChatMessage], model: str, temperature: float) -> Optional[str]:
+        path = self._path(messages, model, temperature)
+        if not path.exists():
+            return None
+        try:
+            return json.loads(path.read_text(encoding="utf-8"))["content"]
+        except Exception:
+            return None
+
+    def set(self, messages: List[ChatMessage], model: str, temperature: float, content: str) -> None:
+        path = self._path(messages, model, temperature)
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = path.with_suffix(".tmp")
+            tmp.write_text(json.dumps({"content": content}, ensure_ascii=False), encoding="utf-8")
+            os.replace(tmp, path)
+        except Exception:
+            pass
@@ -1,35 +1,86 @@
 from __future__ import annotations
+import asyncio
+import os
+import threading
 from typing import List, Dict, Any, Optional
 
+from .cache import PromptCache
 from .types import ChatMessage, ChatResult
 from .errors import LLMConfigError
 from .settings import (
-    LLM_API_URL, LLM_API_KEY, LLM_DEFAULT_MODEL,
+    LLM_API_URL, LLM_API_KEY, LLM_DEFAULT_MODEL, LLM_PROMPT_CACHE_CONTROL,
 )
 from .providers import OpenAICompatProvider
 
 class LLMEngine:
     """
-    项目统一的 LLM 客户端封装：
+    项目统一的 LLM 客户端封装（全局仅此一份定义，单例见底部 get_engine）：
     - chat(messages) 低层
     - ask_text(prompt) 简单问答
     - ask_decision(prompt, keywords) 关键词判定
-    - gen_react_jsx(prompt, width, height) 生成 React 组件 JSX
+    - achat/abatch 异步并发调用
     """
     def __init__(self, api_url: str = LLM_API_URL, api_key: Optional[str] = LLM_API_KEY, default_model: str = LLM_DEFAULT_MODEL):
         if not api_key:
             raise LLMConfigError("Missing LLM_API_KEY / SILICONFLOW_API_TOKEN")
         self.default_model = default_model
         self.provider = OpenAICompatProvider(api_url=api_url, api_key=api_key)
+        self.cache = PromptCache()
+        self._async_provider = None
 
     # -------- 基础接口 --------
-    def chat(self, messages: List[ChatMessage], *, model: Optional[str] = None, **kw) -> ChatResult:
-        return self.provider.chat(messages=messages, model=model or self.default_model, **kw)
+    def chat(self, messages: List[ChatMessage], *, model: Optional[str] = None, use_cache: bool = True, **kw) -> ChatResult:
+        """use_cache=False 跳过磁盘缓存读取（重试重新生成时用——
+        同样的 messages 命中缓存只会原样吐回刚失败的那份答案）。"""
+        model = model or self.default_model
+        temperature = kw.get("temperature", 0.2)
+        cacheable = self.cache.cacheable(temperature=temperature, stream=kw.get("stream", False))
+        if cacheable and use_cache:
+            cached = self.cache.get(messages, model, temperature)
+            if cached is not None:
+                return ChatResult(content=cached)
+        res = self.provider.chat(messages=messages, model=model, **kw)
+        if cacheable:
+            # 绕过读取的重试也回写：新鲜产物覆盖掉刚被否掉的旧条目
+            self.cache.set(messages, model, temperature, res.content)
+        return res
 
     # -------- 便捷封装 --------
-    def ask_text(self, prompt: str, **kw) -> str:
-        res = self.chat([{"role": "user", "content": prompt}], **kw)
-        return res["content"].strip()
+    def ask_text(self, prompt: str, *, system: Optional[str] = None, **kw) -> str:
+        """
+        简单问答。system 传静态前缀时固定放在首位（[system, user] 顺序），
+        字节序列不变可命中网关的自动 prefix caching。
+        """
+        messages: List[ChatMessage] = []
+        if system:
+            sys_msg: Dict[str, Any] = {"role": "system", "content": system}
+            if LLM_PROMPT_CACHE_CONTROL:
+                # Anthropic 风格网关：显式标记静态前缀为可缓存
+                sys_msg["cache_control"] = {"type": "ephemeral"}
+            messages.append(sys_msg)
+        messages.append({"role": "user", "content": prompt})
+        res = self.chat(messages, **kw)
+        return res.content.strip()
+
+    # -------- 异步接口（并发批量调用） --------
+    async def achat(self, messages: List[ChatMessage], *, model: Optional[str] = None, **kw) -> ChatResult:
+        if self._async_provider is None:
+            from .providers.openai_compat_async import OpenAICompatAsyncProvider
+            self._async_provider = OpenAICompatAsyncProvider(
+                api_url=self.provider.api_url, api_key=self.provider.api_key
+            )
+        return await self._async_provider.achat(messages, model or self.default_model, **kw)
+
+    async def abatch(self, prompts: List[str], **kw) -> List[str]:
+        """并发问答：受 LLM_CONCURRENCY 信号量约束，结果按输入顺序返回。"""
+        sem = asyncio.Semaphore(max(1, int(os.getenv("LLM_CONCURRENCY", "8"))))
+
+        async def one(prompt: str) -> str:
+            async with sem:
+                res = await self.achat([{"role": "user", "content": prompt}], **kw)
+                return res.content.strip()
+
+        return list(await asyncio.gather(*(one(p) for p in prompts)))
 
     def ask_decision(self, prompt: str, positive_keywords=("generate",), fallback="search", **kw) -> str:
         """
@@ -42,9 +93,13 @@ class LLMEngine:
 
 # -------- 全局单例（简单好用） --------
 _engine_singleton: Optional[LLMEngine] = None
+_engine_lock = threading.Lock()
 
 def get_engine() -> LLMEngine:
     global _engine_singleton
     if _engine_singleton is None:
-        _engine_singleton = LLMEngine()
+        # 加锁防止并发首调构造出两个 provider（各自一套连接池）
+        with _engine_lock:
+            if _engine_singleton is None:
+                _engine_singleton = LLMEngine()
     return _engine_singleton
@@ -7,5 +7,9 @@ class LLMHTTPError(LLMError):
         self.status = status
         self.text = text
 
+class LLMRetryableError(LLMHTTPError):
+    """可重试的 HTTP 错误（429 / 5xx）；4xx 其余错误重试也不会成功。"""
+    pass
+
 class LLMConfigError(LLMError):
     pass
@@ -1,12 +1,13 @@
 from __future__ import annotations
-import time, json
+import time, json, random, threading
 from typing import List, Dict, Any, Optional
 import requests
+from requests.adapters import HTTPAdapter
 
 from ..types import ChatMessage, ChatResult
-from ..errors import LLMHTTPError
+from ..errors import LLMHTTPError, LLMRetryableError
 from ..settings import (
-    LLM_TIMEOUT_SECONDS, LLM_MAX_RETRIES, LLM_BACKOFF_BASE,
+    LLM_TIMEOUT_SECONDS, LLM_MAX_RETRIES, LLM_BACKOFF_BASE, LLM_KEEP_RAW,
 )
 
 class OpenAICompatProvider:
@@ -16,6 +17,25 @@ class OpenAICompatProvider:
     def __init__(self, api_url: str, api_key: str):
         self.api_url = api_url
         self.api_key = api_key
+        # 连接池：所有 chat 调用复用同一批 TCP/TLS 连接
+        self._session = requests.Session()
+        self._session.mount("https://", HTTPAdapter(pool_connections=8, pool_maxsize=32))
+        self._session.mount("http://", HTTPAdapter(pool_connections=8, pool_maxsize=32))
+        # 鉴权/内容头挂在 Session 默认值上，省掉每次调用重建 dict
+        self._session.headers.update({
+            "Authorization": f"Bearer {api_key}",
+            "Content-Type": "application/json",
+            "Accept": "application/json",
+        })
+        # 后台预热 TCP+TLS：首个真实请求不用再付冷启动握手
+        threading.Thread(target=self._warm_connection, daemon=True).start()
+
+    def _warm_connection(self) -> None:
+        try:
+            base = self.api_url.rsplit("/v1", 1)[0] + "/"
+            self._session.get(base, timeout=2)
+        except Exception:
+            pass  # 纯预热，失败无所谓
 
     def chat(
         self,
@@ -27,10 +47,6 @@ class OpenAICompatProvider:
         stream: bool = False,
         extra: Optional[Dict[str, Any]] = None,
     ) -> ChatResult:
-        headers = {
-            "Authorization": f"Bearer {self.api_key}",
-            "Content-Type": "application/json",
-        }
         payload: Dict[str, Any] = {
             "model": model,
             "messages": messages,
@@ -43,21 +59,34 @@ class OpenAICompatProvider:
 
         backoff = LLM_BACKOFF_BASE
         for attempt in range(1, LLM_MAX_RETRIES + 1):
+            retry_after = None
             try:
-                resp = requests.post(
+                resp = self._session.post(
                     self.api_url,
-                    headers=headers,
                     json=payload,
                     timeout=LLM_TIMEOUT_SECONDS,
                 )
+                if resp.status_code == 429 or resp.status_code >= 500:
+                    retry_after = resp.headers.get("Retry-After")
+                    raise LLMRetryableError(resp.status_code, resp.text)
                 if resp.status_code >= 400:
+                    # 其余 4xx 重试也不会成功，直接抛出，不烧重试额度
                     raise LLMHTTPError(resp.status_code, resp.text)
                 data = resp.json()
                 content = data["choices"][0]["message"]["content"]
-                return {"content": content, "raw": data}
-            except Exception as e:
+                return ChatResult(content=content, raw=data if LLM_KEEP_RAW else None)
+            except (LLMRetryableError,
+                    requests.exceptions.ConnectionError,
+                    requests.exceptions.Timeout) as e:
                 print(f'chat failed due to {e}')
                 if attempt >= LLM_MAX_RETRIES:
                     raise
-                time.sleep(backoff)
+                try:
+                    wait = float(retry_after) if retry_after is not None else None
+                except (TypeError, ValueError):
+                    wait = None
+                if wait is None:
+                    # full jitter：并发客户端的重试时间点彼此错开
+                    wait = backoff + random.uniform(0, backoff)
+                time.sleep(wait)
                 backoff *= 2.0  # 简单指数回退
@@ -0,0 +1,79 @@
+from __future__ import annotations
+import asyncio
+from typing import List, Dict, Any, Optional
+
+from ..types import ChatMessage, ChatResult
+from ..errors import LLMHTTPError
+from ..settings import (
+    LLM_TIMEOUT_SECONDS, LLM_MAX_RETRIES, LLM_BACKOFF_BASE, LLM_KEEP_RAW,
+)
+
+
+class OpenAICompatAsyncProvider:
+    """
+    aiohttp 版 /v1/chat/completions 客户端，供并发 LLM 调用使用。
+    aiohttp 延迟导入：未安装时不影响同步路径。
+    """
+
+    def __init__(self, api_url: str, api_key: str):
+        self.api_url = api_url
+        self.api_key = api_key
+        self._session = None
+        self._session_loop = None
+
+    async def _get_session(self):
+        import aiohttp  # 延迟导入，避免无依赖时崩
+        loop = asyncio.get_running_loop()
+        # session/connector 绑在创建时的 event loop 上；asyncio.run 每次
+        # 新建 loop，跨 loop 复用会报 "Event loop is closed"，换 loop 就重建
+        if self._session is None or self._session.closed or self._session_loop is not loop:
+            self._session_loop = loop
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=64, ttl_dns_cache=300),
+                headers={
+                    "Authorization": f"Bearer {self.api_key}",
+                    "Content-Type": "application/json",
+                },
+            )
+        return self._session
+
+    async def achat(
+        self,
+        messages: List[ChatMessage],
+        model: str,
+        *,
+        temperature: float = 0.2,
+        max_tokens: int = 1200,
+        stream: bool = False,
+        extra: Optional[Dict[str, Any]] = None,
+    ) -> ChatResult:
+        payload: Dict[str, Any] = {
+            "model": model,
+            "messages": messages,
+            "temperature": temperature,
+            "max_tokens": max_tokens,
+            "stream": stream,
+        }
+        if extra:
+            payload.update(extra)
+
+        backoff = LLM_BACKOFF_BASE
+        for attempt in range(1, LLM_MAX_RETRIES + 1):
+            try:
+                session = await self._get_session()
+                async with session.post(self.api_url, json=payload, timeout=LLM_TIMEOUT_SECONDS) as resp:
+                    if resp.status >= 400:
+                        raise LLMHTTPError(resp.status, await resp.text())
+                    data = await resp.json()
+                    content = data["choices"][0]["message"]["content"]
+                    return ChatResult(content=content, raw=data if LLM_KEEP_RAW else None)
+            except Exception as e:
+                print(f'achat failed due to {e}')
+                if attempt >= LLM_MAX_RETRIES:
+                    raise
+                await asyncio.sleep(backoff)
+                backoff *= 2.0  # 简单指数回退
+
+    async def aclose(self) -> None:
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
@@ -11,6 +11,14 @@ LLM_API_URL = os.getenv("LLM_API_URL", "https://api.siliconflow.cn/v1/chat/compl
 LLM_API_KEY = os.getenv("LLM_API_TOKEN") or os.getenv("SILICONFLOW_API_TOKEN")
 LLM_DEFAULT_MODEL = os.getenv("LLM_DEFAULT_MODEL", "deepseek-ai/DeepSeek-V3")
 
+# 是否在 ChatResult.raw 中保留完整响应（调试用，默认不留）
+LLM_KEEP_RAW = os.getenv("LLM_KEEP_RAW", "0").lower() in ("1", "true")
+
+# 网关支持 Anthropic 风格 cache_control 时置 1：静态 system 前缀标记为可缓存，
+# prompt token 成本与 TTFT 大幅下降；OpenAI/SiliconFlow 的自动 prefix caching
+# 不需要此标记（只要前缀字节一致即可命中），默认关闭
+LLM_PROMPT_CACHE_CONTROL = os.getenv("LLM_PROMPT_CACHE_CONTROL", "0").lower() in ("1", "true")
+
 # 请求超时/重试
 LLM_TIMEOUT_SECONDS = int(os.getenv("LLM_TIMEOUT_SECONDS", "120"))
 LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "3"))
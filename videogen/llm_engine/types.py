@@ -1,4 +1,5 @@
-from typing import TypedDict, Literal, List, Optional, Dict, Any
+from dataclasses import dataclass
+from typing import TypedDict, Literal, Dict, Any, Optional
 
 Role = Literal["system", "user", "assistant"]
 
@@ -6,6 +7,11 @@ class ChatMessage(TypedDict):
     role: Role
     content: str
 
-class ChatResult(TypedDict):
+@dataclass(slots=True, frozen=True)
+class ChatResult:
+    """
+    chat 返回值：slots 省掉每次调用一个 dict 的分配；
+    raw 默认不保留（LLM_KEEP_RAW=1 打开），避免整份响应常驻内存。
+    """
     content: str
-    raw: Dict[str, Any]
+    raw: Optional[Dict[str, Any]] = None
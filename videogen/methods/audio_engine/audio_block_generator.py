@@ -1,16 +1,23 @@
 from __future__ import annotations
+import hashlib
 import os
 import re
 import json
+import shutil
 import subprocess
+import time
+import wave
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from pathlib import Path
 from typing import Dict, Any, List, Tuple, Optional
 
 import requests
+from requests.adapters import HTTPAdapter
 from dotenv import load_dotenv
 from pydub.utils import mediainfo
 
-from .utils import get_total_audio_duration_ms
+from .utils import get_audio_durations_ms, get_total_audio_duration_ms
 from ..base import BaseMethod
 from ..registry import register_method
 from ...pipeline.schema import ScriptBlock
@@ -22,6 +29,10 @@ TTS_SERVER_IP = os.getenv("TTS_SERVER_IP", "127.0.0.1")
 TTS_PORT = os.getenv("TTS_PORT", "9880")
 TTS_URL = f"http://{TTS_SERVER_IP}:{TTS_PORT}/tts"
 
+# 复用同一个 Session：keep-alive 连接池，避免每个 clip 重新 TCP 握手
+_SESSION = requests.Session()
+_SESSION.mount("http://", HTTPAdapter(pool_connections=16, pool_maxsize=32))
+
 # 默认参数（每次请求会 copy 一份再覆盖）
 DEFAULT_TTS_PARAMS = {
     "text_lang": "zh",
@@ -38,6 +49,16 @@ DEFAULT_TTS_PARAMS = {
 }
 
 # ----------------- 工具函数 -----------------
+@lru_cache(maxsize=8)
+def _load_audio_config_cached(cfg_path_str: str, mtime_ns: int) -> Dict[str, Any]:
+    """按 (路径, mtime) 缓存 YAML 解析结果；文件变更后自动失效。"""
+    try:
+        import yaml  # 延迟导入，避免无依赖时崩
+        return yaml.safe_load(Path(cfg_path_str).read_text(encoding="utf-8")) or {}
+    except Exception:
+        return {}
+
+
 def _load_audio_config(workdir: Path) -> Dict[str, Any]:
     """
     从 {workdir}/config/audio_config.yaml 读取配置；没有则返回空 dict。
@@ -53,13 +74,11 @@ def _load_audio_config(workdir: Path) -> Dict[str, Any]:
           prompt_text: "hello I'm Alice"
     """
     cfg_path = workdir / "config" / "audio_config.yaml"
-    if not cfg_path.exists():
-        return {}
     try:
-        import yaml  # 延迟导入，避免无依赖时崩
-        return yaml.safe_load(cfg_path.read_text(encoding="utf-8")) or {}
-    except Exception:
+        mtime_ns = os.stat(cfg_path).st_mtime_ns
+    except OSError:
         return {}
+    return _load_audio_config_cached(str(cfg_path), mtime_ns)
 
 def _switch_character_model(cfg: Dict[str, Any], character: str, emotion: str) -> Dict[str, Any]:
     """
@@ -104,11 +123,22 @@ def _get_voice_content(block: Optional[ScriptBlock]) -> str:
     text_content = block.text
     return text_content
 
-def _format_time(seconds: float) -> str:
-    mins, secs = divmod(seconds, 60.0)
-    hours, mins = divmod(int(mins), 60)
-    ms = int(round((seconds - int(seconds)) * 1000))
-    return f"{int(hours):02}:{int(mins):02}:{int(secs)%60:02},{ms:03}"
+# 模块级预编译，避免每次调用走 re 内部缓存查找
+_CLIP_RE = re.compile(r"[，。？,\.?\n]+")
+
+
+def _split_text_into_clips(text: str) -> List[str]:
+    """按中英文标点/换行把长文本切成短句，供 TTS 分段合成。"""
+    parts = _CLIP_RE.split(text)
+    return [p.strip() for p in parts if p.strip()]
+
+
+def _format_time_ms(ms: int) -> str:
+    """纯整数 divmod 的 SRT 时间格式化：没有浮点舍入（旧实现偶发 ms=1000）。"""
+    h, rem = divmod(int(ms), 3_600_000)
+    m, rem = divmod(rem, 60_000)
+    s, ms = divmod(rem, 1_000)
+    return f"{h:02}:{m:02}:{s:02},{ms:03}"
 
 
 def _has_ffmpeg() -> bool:
@@ -119,6 +149,54 @@ import subprocess, shlex
 from pathlib import Path
 from typing import List
 
+def _write_silent_wav(path: Path, like_paths: List[Path]) -> None:
+    """
+    0 帧的合法 WAV 占位（头完整、无数据）：参数向同批成功的 clip 看齐，
+    原生拼接和 ffmpeg 路径都能照常消化，一个失败 clip 不拖垮整个 block。
+    """
+    nchannels, sampwidth, framerate = 1, 2, 44100
+    for p in like_paths:
+        if p == path:
+            continue
+        try:
+            with wave.open(str(p), "rb") as w:
+                nchannels, sampwidth, framerate = w.getparams()[:3]
+            break
+        except (wave.Error, OSError, EOFError):
+            continue
+    with wave.open(str(path), "wb") as out:
+        out.setnchannels(nchannels)
+        out.setsampwidth(sampwidth)
+        out.setframerate(framerate)
+
+
+def _concat_wavs_native(wav_paths: List[Path], out_path: Path) -> bool:
+    """
+    同参数 PCM WAV 直接在进程内拼 data 块（只重写一个头），
+    不用为每次合并 fork 一个 ffmpeg。参数不一致时返回 False，
+    由调用方回退 ffmpeg 重编码路径。
+    """
+    if not wav_paths:
+        return False
+    try:
+        with wave.open(str(wav_paths[0]), "rb") as first:
+            params = first.getparams()
+        with wave.open(str(out_path), "wb") as out:
+            out.setparams(params)
+            for p in wav_paths:
+                with wave.open(str(p), "rb") as w:
+                    # 只比 (nchannels, sampwidth, framerate)——第 4 项是 nframes，
+                    # 不同时长的片段帧数必然不同，不是格式不兼容
+                    if w.getparams()[:3] != params[:3]:
+                        raise ValueError(f"WAV params mismatch: {p}")
+                    out.writeframes(w.readframes(w.getnframes()))
+        return True
+    except Exception as e:
+        print(f"[concat] native concat failed ({e}), falling back to ffmpeg")
+        out_path.unlink(missing_ok=True)
+        return False
+
+
 def _concat_wavs_with_ffmpeg(wav_paths: List[Path], out_path: Path) -> bool:
     if not wav_paths:
         print("[concat] no wav files")
@@ -173,17 +251,62 @@ def _concat_wavs_with_ffmpeg(wav_paths: List[Path], out_path: Path) -> bool:
             pass
 
 
-def _tts_request(params: Dict[str, Any], out_path: Path) -> bool:
+def _tts_cache_key(params: Dict[str, Any]) -> str:
+    """按文本 + TTS 参数算稳定 hash，相同输入可直接复用缓存音频。"""
+    payload = json.dumps(
+        {"text": params.get("text", ""), "params": sorted((k, str(v)) for k, v in params.items() if k != "text")},
+        ensure_ascii=False,
+    )
+    return hashlib.blake2b(payload.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def _prune_tts_cache(cache_dir: Path) -> None:
+    """按 TTS_CACHE_TTL（秒）清理过期缓存；默认 30 天。"""
+    ttl = float(os.getenv("TTS_CACHE_TTL", str(30 * 86400)))
+    now = time.time()
     try:
-        # 你的服务是 GET 带 query 的形式；考虑兼容 POST：
-        resp = requests.get(TTS_URL, params=params, timeout=60)
-        if resp.status_code == 200:
+        for p in cache_dir.glob("*.wav"):
+            if now - p.stat().st_mtime > ttl:
+                p.unlink(missing_ok=True)
+    except Exception:
+        pass
+
+
+def _copy_or_link(src: Path, dst: Path) -> None:
+    dst.unlink(missing_ok=True)
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copyfile(src, dst)
+
+
+def _tts_request(params: Dict[str, Any], out_path: Path, cache_dir: Optional[Path] = None) -> bool:
+    cache_path = None
+    if cache_dir is not None:
+        cache_path = cache_dir / f"{_tts_cache_key(params)}.wav"
+        if cache_path.exists():
             out_path.parent.mkdir(parents=True, exist_ok=True)
-            out_path.write_bytes(resp.content)
+            _copy_or_link(cache_path, out_path)
             return True
-        else:
-            print(f"[TTS] HTTP {resp.status_code} {resp.reason}")
-            return False
+    try:
+        # 你的服务是 GET 带 query 的形式；考虑兼容 POST：
+        # stream=True 边收边写盘，不在内存里攒整个 WAV；
+        # 先写 .part 再原子 rename，并发 worker 不会看到半成品文件
+        with _SESSION.get(TTS_URL, params=params, timeout=60, stream=True) as resp:
+            resp.raise_for_status()
+            out_path.parent.mkdir(parents=True, exist_ok=True)
+            part_path = out_path.with_suffix(".part")
+            with open(part_path, "wb") as f:
+                for chunk in resp.iter_content(chunk_size=64 * 1024):
+                    f.write(chunk)
+            os.replace(part_path, out_path)
+        if cache_path is not None:
+            cache_dir.mkdir(parents=True, exist_ok=True)
+            _copy_or_link(out_path, cache_path)
+        return True
+    except requests.HTTPError as e:
+        print(f"[TTS] HTTP {e.response.status_code} {e.response.reason}")
+        return False
     except Exception as e:
         print(f"[TTS] Request error: {e}")
         return False
@@ -197,17 +320,18 @@ def _gen_block_audio(
     character: str = "default",
     emotion: str = "neutral",
     regen: bool = True,
-) -> Tuple[List[Path], str, int]:
+    srt_path: Optional[Path] = None,
+) -> Tuple[List[Path], int]:
     """
     为单个 block 生成音频，返回：
       - wav 文件路径列表（单个文件）
-      - srt 文本
       - 总时长（毫秒）
+    传入 srt_path 时边算边写字幕文件，不在内存里拼接整份 SRT 文本。
     """
     # 获取 voice 内容，如果没有则使用 text
     voice_content = _get_voice_content(block)
     if not voice_content:
-        return [], "", 0
+        return [], 0
     
     audio_dir = project_dir / "audio"
     subs_dir = project_dir / "subtitles"
@@ -216,30 +340,83 @@ def _gen_block_audio(
 
     overrides = _switch_character_model(cfg, character, emotion)
 
-    # 生成单个音频文件
-    wav_name = f"{base_name}.wav"
-    wav_path = audio_dir / wav_name
+    # 合并后的完整音频
+    wav_path = audio_dir / f"{base_name}.wav"
+
+    clips = _split_text_into_clips(voice_content)
+    if not clips:
+        clips = [voice_content]
+
+    clip_paths = [audio_dir / f"{base_name}_{i:03d}.wav" for i in range(len(clips))]
+
+    cache_dir = project_dir.parent.parent / ".cache" / "tts"
+    if cache_dir.exists():
+        _prune_tts_cache(cache_dir)
+
+    if not (wav_path.exists() and not regen):
+        # Pass 1: 收集需要合成的 clip（网络 I/O 任务）
+        # base_params 只合并一次；每个 clip 拿自己的浅拷贝，线程安全
+        # 同文本 clip（口头禅/重复句）只合成一次，其余硬链接复用
+        base_params = {**DEFAULT_TTS_PARAMS, **overrides}
+        tasks = []
+        first_seen: Dict[str, Path] = {}
+        dup_links: List[Tuple[Path, Path]] = []
+        for clip, clip_path in zip(clips, clip_paths):
+            if clip_path.exists() and not regen:
+                first_seen.setdefault(clip, clip_path)
+                continue
+            if clip in first_seen:
+                dup_links.append((first_seen[clip], clip_path))
+                continue
+            first_seen[clip] = clip_path
+            tasks.append(({**base_params, "text": clip}, clip_path))
+
+        # Pass 2: 并发请求 TTS（纯 I/O 等待，线程池即可；上限可控避免压垮服务端）
+        if tasks:
+            max_workers = max(1, int(os.getenv("TTS_CONCURRENCY", "4")))
+            with ThreadPoolExecutor(max_workers=max_workers) as ex:
+                results = list(ex.map(lambda t: _tts_request(t[0], t[1], cache_dir), tasks))
+            for (params, clip_path), ok in zip(tasks, results):
+                if not ok:
+                    print(f"[TTS] Failed for clip {clip_path.name}, inserting 0s placeholder.")
+                    _write_silent_wav(clip_path, clip_paths)
+
+        # 重复 clip：直接复用首次合成的文件
+        for src, dst in dup_links:
+            if src.exists():
+                _copy_or_link(src, dst)
+            else:
+                _write_silent_wav(dst, clip_paths)
+
+        # 合并为单个音频文件（优先进程内拼接，参数不一致时退回 ffmpeg）
+        if len(clip_paths) == 1:
+            clip_paths[0].replace(wav_path)
+            clip_paths = [wav_path]
+        elif not _concat_wavs_native(clip_paths, wav_path) and not _concat_wavs_with_ffmpeg(clip_paths, wav_path):
+            print(f"[TTS] Failed to merge clips for block {base_name}.")
+            return [], 0
+
+    # Pass 3: 批量取时长 & 流式写 SRT（每个 clip 一条字幕，逐条落盘不攒大字符串）
+    clip_durs = get_audio_durations_ms(clip_paths)
+    current_ms = 0
+    srt_f = srt_path.open("w", encoding="utf-8", buffering=1 << 16) if srt_path else None
+    try:
+        for idx, (clip, clip_dur) in enumerate(zip(clips, clip_durs), start=1):
+            if srt_f:
+                srt_f.write(
+                    f"{idx}\n{_format_time_ms(current_ms)} --> {_format_time_ms(current_ms + clip_dur)}\n{clip}\n\n"
+                )
+            current_ms += clip_dur
+    finally:
+        if srt_f:
+            srt_f.close()
 
-    if wav_path.exists() and not regen:
-        pass
-    else:
-        params = {**DEFAULT_TTS_PARAMS, **overrides}
-        params["text"] = voice_content
-        ok = _tts_request(params, wav_path)
-        if not ok:
-            print(f"[TTS] Failed for block {base_name}, inserting 0s placeholder.")
-            wav_path.touch()
-
-    # duration in ms
-    dur_ms = get_total_audio_duration_ms(wav_path)
-    
-    # 生成 SRT 内容
-    srt_lines = [
-        f"1\n{_format_time(0)} --> {_format_time(dur_ms / 1000)}\n{voice_content}\n\n"
-    ]
-    srt_text = "".join(srt_lines)
-    
-    return [wav_path], srt_text, dur_ms
+    # 总时长直接用 clip 之和，避免再探一次合并后的文件
+    dur_ms = current_ms
+    if not dur_ms:
+        dur_ms = get_total_audio_duration_ms(wav_path)
+
+    return [wav_path], dur_ms
 
 
 @register_method
@@ -295,8 +472,12 @@ class AudioEngineMethod(BaseMethod):
             # 加载配置（如果存在）
             cfg = _load_audio_config(workdir)
 
-            # 生成音频 + srt
-            clips, srt_text, total_sec = _gen_block_audio(
+            # 生成音频 + srt（字幕由 _gen_block_audio 边算边写入 srt_path）
+            subs_dir = project_dir / "subtitles"
+            subs_dir.mkdir(parents=True, exist_ok=True)
+            srt_path = subs_dir / f"{target_name}.srt"
+
+            clips, total_sec = _gen_block_audio(
                 block=block,
                 project_dir=project_dir,
                 base_name=target_name,
@@ -304,6 +485,7 @@ class AudioEngineMethod(BaseMethod):
                 character=cfg.get("default_character", "default"),
                 emotion=cfg.get("default_emotion", "neutral"),
                 regen=True,   # 如需跳过已存在可改为 False
+                srt_path=srt_path,
             )
 
             if not clips:
@@ -314,11 +496,6 @@ class AudioEngineMethod(BaseMethod):
                     "error": "Failed to generate audio clips.",
                 }
 
-            # 写入 srt
-            subs_dir = project_dir / "subtitles"
-            srt_path = subs_dir / f"{target_name}.srt"
-            srt_path.write_text(srt_text, encoding="utf-8")
-
             # 对于单个文件，merged 就是原文件
             merged_path = clips[0]  # 只有一个文件
             merged_rel = str(merged_path.relative_to(project_dir))
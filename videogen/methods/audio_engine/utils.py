@@ -1,7 +1,37 @@
+import wave
 from pathlib import Path
 from typing import List, Union
 from pydub.utils import mediainfo
 
+def _wav_duration_ms(path: Union[Path, str]) -> int:
+    """
+    直接读 WAV(RIFF) 头计算时长，不 fork ffprobe 子进程。
+    非 RIFF 文件会抛异常，由调用方回退 mediainfo。
+    """
+    with wave.open(str(path), "rb") as w:
+        framerate = w.getframerate()
+        if framerate <= 0:
+            raise ValueError(f"Invalid framerate in {path}")
+        return int(w.getnframes() * 1000 / framerate)
+
+def get_audio_durations_ms(audio_files: List[Union[Path, str]]) -> List[int]:
+    """
+    一次性返回每个文件的时长（毫秒）。全部走 WAV 头快速路径，
+    个别非 WAV 文件才退回 mediainfo（ffprobe 一次只能探一个输入，
+    所以"批量"意义上的优化就是避免任何子进程）。
+    """
+    durations: List[int] = []
+    for path in audio_files:
+        try:
+            durations.append(_wav_duration_ms(path))
+        except Exception:
+            try:
+                info = mediainfo(str(path))
+                durations.append(int(float(info.get("duration", 0.0)) * 1000))
+            except Exception:
+                durations.append(0)
+    return durations
+
 def get_total_audio_duration_ms(audio_files: Union[Path, str, List[Union[Path, str]]]) -> int:
     """
     Calculate total duration (in milliseconds) of one or multiple audio files.
@@ -21,10 +51,14 @@ def get_total_audio_duration_ms(audio_files: Union[Path, str, List[Union[Path, s
     total_ms = 0
     for path in audio_files:
         try:
-            info = mediainfo(str(path))
-            dur_sec = float(info.get("duration", 0.0))
-            total_ms += int(dur_sec * 1000)
+            total_ms += _wav_duration_ms(path)
         except Exception:
-            continue
+            # 非 WAV / 损坏文件：退回 ffprobe（mediainfo）
+            try:
+                info = mediainfo(str(path))
+                dur_sec = float(info.get("duration", 0.0))
+                total_ms += int(dur_sec * 1000)
+            except Exception:
+                continue
 
     return total_ms
@@ -2,6 +2,7 @@
 from __future__ import annotations
 import json
 import os
+from functools import lru_cache
 from pathlib import Path
 from typing import Dict, Any
 import requests
@@ -20,27 +21,35 @@ CONFIG_PATH = PROJECT_ROOT / "config" / "voice_config.json"
 ASSET_DIR = PROJECT_ROOT / "assets" / "voices"
 
 # ========== JSON 操作 ==========
+@lru_cache(maxsize=1)
+def _load_config_cached(mtime_ns: int) -> Dict[str, Any]:
+    """按 mtime 缓存解析结果：文件没变就不重复解析 JSON"""
+    try:
+        return json.loads(CONFIG_PATH.read_text(encoding="utf-8"))
+    except Exception as e:
+        print(f"[VoiceConfig] ⚠️ Failed to read config: {e}")
+        return {}
+
+
 def _load_config() -> Dict[str, Any]:
-    """读取本地 voice_config.json"""
+    """读取本地 voice_config.json（热路径上被反复调用，带 mtime 缓存）"""
     if CONFIG_PATH.exists():
-        try:
-            return json.loads(CONFIG_PATH.read_text(encoding="utf-8"))
-        except Exception as e:
-            print(f"[VoiceConfig] ⚠️ Failed to read config: {e}")
+        return _load_config_cached(os.stat(CONFIG_PATH).st_mtime_ns)
     return {}
 
 
 def _save_config(cfg: Dict[str, Any]) -> None:
-    """保存配置文件"""
+    """保存配置文件（先写临时文件再 os.replace，写中途崩溃不损坏原文件）"""
     CONFIG_PATH.parent.mkdir(parents=True, exist_ok=True)
-    CONFIG_PATH.write_text(json.dumps(cfg, indent=2, ensure_ascii=False), encoding="utf-8")
+    tmp = CONFIG_PATH.with_suffix(".json.tmp")
+    tmp.write_text(json.dumps(cfg, indent=2, ensure_ascii=False), encoding="utf-8")
+    os.replace(tmp, CONFIG_PATH)
 
 
 # ========== 上传语音 ==========
 def _upload_voice(character: str, file_path: Path, text: str) -> str:
     """上传参考音频，返回 URI"""
     headers = {"Authorization": f"Bearer {SILICON_API_KEY}"}
-    files = {"file": open(file_path, "rb")}
     payload = {
         "model": MODEL_NAME,
         "customName": character,
@@ -49,7 +58,15 @@ def _upload_voice(character: str, file_path: Path, text: str) -> str:
 
     try:
         print(f"[VoiceConfig] ⬆️ Uploading '{character}' voice from {file_path.name} ...")
-        resp = requests.post(UPLOAD_URL, data=payload, files=files, headers=headers, timeout=60)
+        # with 托管文件句柄：requests 直接流式读文件，异常也不会泄漏 FD
+        with open(file_path, "rb") as fh:
+            resp = requests.post(
+                UPLOAD_URL,
+                data=payload,
+                files={"file": (file_path.name, fh, "audio/wav")},
+                headers=headers,
+                timeout=60,
+            )
         if resp.status_code == 200:
             uri = resp.json().get("uri", "")
             if uri:
@@ -59,8 +76,6 @@ def _upload_voice(character: str, file_path: Path, text: str) -> str:
             print(f"[VoiceConfig] ❌ Upload failed ({resp.status_code}): {resp.text[:200]}")
     except Exception as e:
         print(f"[VoiceConfig] ❌ Exception while uploading: {e}")
-    finally:
-        files["file"].close()
     return ""
 
 
@@ -101,7 +116,8 @@ def ensure_voice_uri(character: str | None) -> str:
             print(f"[VoiceConfig] ❌ Missing local file for {character}: {file_path}")
             return ""
 
-    sample_text = entry.get('text')
+    # entry 可能还没有缓存行（只有本地 wav），不要直接 .get 崩掉
+    sample_text = (entry or {}).get('text') or ""
 
     # 🔹 上传语音并更新缓存
     uri = _upload_voice(character, file_path, sample_text)
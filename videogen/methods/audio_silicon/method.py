@@ -1,11 +1,16 @@
 #!/usr/bin/env python3
 from __future__ import annotations
+import asyncio
+import hashlib
 import json
 import os
+import shutil
 import requests
 from pathlib import Path
 from typing import Dict, Any, Optional
 from dotenv import load_dotenv
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from ..base import BaseMethod
 from ..registry import register_method
 from ...pipeline.schema import ScriptBlock
@@ -16,6 +21,18 @@ load_dotenv()
 SILICON_API_KEY = os.getenv("SILICONFLOW_API_TOKEN")
 SILICON_TTS_URL = "https://api.siliconflow.cn/v1/audio/speech"
 
+# 模块级连接池：多个 block 的 TTS 调用复用 keep-alive 连接，免去每次 TLS 握手
+_SESSION = requests.Session()
+_SESSION.mount("https://", HTTPAdapter(
+    pool_connections=8, pool_maxsize=32,
+    max_retries=Retry(total=2, backoff_factor=0.3,
+                      status_forcelist=(429, 500, 502, 503, 504)),
+))
+_SESSION.headers.update({
+    "Authorization": f"Bearer {SILICON_API_KEY}",
+    "Content-Type": "application/json",
+})
+
 # =============== 默认参数 ===============
 DEFAULT_SILICON_PARAMS = {
     "model": "FunAudioLLM/CosyVoice2-0.5B",
@@ -36,27 +53,163 @@ def _get_voice_content(block: Optional[ScriptBlock], text: str = "", prompt: str
     return text or prompt or ""
 
 
+# 跨项目复用的 TTS 结果缓存：同文本+同音色+同参数不再重复扣 API 额度
+_TTS_CACHE_ROOT = Path.home() / ".cache" / "videogen" / "silicon_tts"
+
+
+def _silicon_cache_path(params: Dict[str, Any]) -> Path:
+    """缓存键 = sha256(input|voice|其余参数)，两级目录防单目录爆炸"""
+    key = hashlib.sha256(json.dumps(params, sort_keys=True, ensure_ascii=False).encode()).hexdigest()
+    return _TTS_CACHE_ROOT / key[:2] / f"{key}.wav"
+
+
+def _copy_or_link(src: Path, dst: Path) -> None:
+    """优先硬链接（零拷贝），跨文件系统退回普通拷贝"""
+    dst.parent.mkdir(parents=True, exist_ok=True)
+    dst.unlink(missing_ok=True)
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copyfile(src, dst)
+
+
 def _tts_silicon_request(text: str, out_path: Path, params: Dict[str, Any]) -> bool:
-    """调用 SiliconFlow TTS API 并保存音频"""
-    headers = {
-        "Authorization": f"Bearer {SILICON_API_KEY}",
-        "Content-Type": "application/json",
-    }
+    """调用 SiliconFlow TTS API 并保存音频（命中本地缓存时不走网络）"""
+    cache_path = _silicon_cache_path(params)
+    if cache_path.exists():
+        _copy_or_link(cache_path, out_path)
+        print(f"[SiliconTTS] ♻️ Cache hit → {out_path}")
+        return True
+
+    try:
+        # stream=True + 分块写盘：不把整段 WAV 在内存里存两份（resp.content + bytes）
+        with _SESSION.post(SILICON_TTS_URL, json=params, stream=True, timeout=120) as resp:
+            if resp.status_code != 200:
+                print(f"[SiliconTTS] ❌ HTTP {resp.status_code}: {resp.text[:200]}")
+                return False
+            # 先落缓存再硬链接到目标位置，下次同请求零网络开销
+            cache_path.parent.mkdir(parents=True, exist_ok=True)
+            part_path = cache_path.with_suffix(".part")
+            with open(part_path, "wb") as f:
+                for chunk in resp.iter_content(chunk_size=64 * 1024):
+                    f.write(chunk)
+            os.replace(part_path, cache_path)
+        _copy_or_link(cache_path, out_path)
+        print(f"[SiliconTTS] ✅ Audio saved to {out_path}")
+        return True
+    except Exception as e:
+        print(f"[SiliconTTS] ❌ Exception: {e}")
+        return False
+
 
+# 组合请求用的文本分隔：促使模型在 block 间留出可检测的停顿
+_GROUP_SEPARATOR = "。 …… "
 
+
+def _split_wav_on_silence(
+    wav_path: Path,
+    out_paths: list[Path],
+    texts: list[str] | None = None,
+    *,
+    min_silence_ms: int = 250,
+) -> bool:
+    """
+    按静音段把组合 WAV 还原成 len(out_paths) 个 clip。
+    取最长的 N-1 个静音段中点作为切点；静音段数量不足、或切出的
+    各段时长与对应文本长度比例明显不符（说明切到了句内自然停顿而
+    非分隔符停顿），都视为分割失败，由调用方退回逐条合成。
+    """
     try:
-        resp = requests.post(SILICON_TTS_URL, headers=headers, json=params, timeout=120)
-        if resp.status_code == 200:
-            out_path.parent.mkdir(parents=True, exist_ok=True)
-            out_path.write_bytes(resp.content)
+        import audioop  # Python 3.13 起移除（PEP 594）
+    except ImportError:
+        return False
+    import wave
+
+    n_parts = len(out_paths)
+    try:
+        with wave.open(str(wav_path), "rb") as wf:
+            nchannels, sampwidth, framerate, nframes = wf.getparams()[:4]
+            raw = wf.readframes(nframes)
+    except (wave.Error, OSError):
+        return False
+
+    # 20ms 窗口逐段算 RMS，低于峰值 5% 记为静音
+    win_frames = max(1, int(framerate * 0.02))
+    win_bytes = win_frames * sampwidth * nchannels
+    rms = [
+        audioop.rms(raw[i:i + win_bytes], sampwidth)
+        for i in range(0, len(raw) - win_bytes + 1, win_bytes)
+    ]
+    if not rms:
+        return False
+    threshold = max(200, int(max(rms) * 0.05))
+    min_silence_wins = max(1, min_silence_ms // 20)
+
+    # 收集静音 run：(长度, 中点窗口号)
+    runs = []
+    run_start = None
+    for idx, val in enumerate(rms + [threshold + 1]):  # 哨兵收尾
+        if val < threshold:
+            if run_start is None:
+                run_start = idx
+        elif run_start is not None:
+            length = idx - run_start
+            if length >= min_silence_wins:
+                runs.append((length, (run_start + idx) // 2))
+            run_start = None
+
+    # 去掉首尾静音 run（不是 block 边界），再看数量够不够
+    interior = [r for r in runs if 0 < r[1] < len(rms) - 1]
+    if len(interior) < n_parts - 1:
+        return False
+    cuts = sorted(mid for _, mid in sorted(interior, reverse=True)[: n_parts - 1])
+
+    bounds = [0] + [c * win_bytes for c in cuts] + [len(raw)]
+
+    # 合理性校验：各段音频占比应与各段文本字数占比大致相称。
+    # 选中的是句内自然停顿时，相邻 block 的音频会整段漂移，
+    # 占比会明显失衡——这种切分宁可不要，退回逐条合成
+    if texts is not None and len(texts) == n_parts:
+        total_chars = sum(len(t) for t in texts) or 1
+        for t, (lo, hi) in zip(texts, zip(bounds, bounds[1:])):
+            expected = len(t) / total_chars
+            actual = (hi - lo) / len(raw)
+            if not (0.5 * expected <= actual <= 2.0 * expected):
+                return False
+
+    for out_path, (lo, hi) in zip(out_paths, zip(bounds, bounds[1:])):
+        out_path.parent.mkdir(parents=True, exist_ok=True)
+        with wave.open(str(out_path), "wb") as out:
+            out.setnchannels(nchannels)
+            out.setsampwidth(sampwidth)
+            out.setframerate(framerate)
+            out.writeframes(raw[lo:hi])
+    return True
+
+
+async def _tts_silicon_async(session, sem, out_path: Path, params: Dict[str, Any]) -> bool:
+    """异步版 TTS 调用：Semaphore 限流，文件写入丢到线程避免卡事件循环"""
+    cache_path = _silicon_cache_path(params)
+    if cache_path.exists():
+        await asyncio.to_thread(_copy_or_link, cache_path, out_path)
+        print(f"[SiliconTTS] ♻️ Cache hit → {out_path}")
+        return True
+    async with sem:
+        try:
+            async with session.post(SILICON_TTS_URL, json=params, timeout=120) as resp:
+                if resp.status != 200:
+                    body = (await resp.text())[:200]
+                    print(f"[SiliconTTS] ❌ HTTP {resp.status}: {body}")
+                    return False
+                data = await resp.read()
+            cache_path.parent.mkdir(parents=True, exist_ok=True)
+            await asyncio.to_thread(cache_path.write_bytes, data)
+            await asyncio.to_thread(_copy_or_link, cache_path, out_path)
             print(f"[SiliconTTS] ✅ Audio saved to {out_path}")
             return True
-        else:
-            print(f"[SiliconTTS] ❌ HTTP {resp.status_code}: {resp.text[:200]}")
+        except Exception as e:
+            print(f"[SiliconTTS] ❌ Exception: {e}")
             return False
-    except Exception as e:
-        print(f"[SiliconTTS] ❌ Exception: {e}")
-        return False
 
 
 @register_method
@@ -109,11 +262,10 @@ class SiliconAudioMethod(BaseMethod):
             if not ok:
                 return {"ok": False, "artifacts": [], "meta": {}, "error": "TTS generation failed."}
 
-            # 计算音频时长
+            # 计算音频时长：直接读 WAV 头，不为一个数字 fork ffprobe
             try:
-                from pydub.utils import mediainfo
-                info = mediainfo(str(wav_path))
-                total_duration = float(info.get('duration', 0)) * 1000  # 转换为毫秒
+                from ..audio_engine.utils import get_total_audio_duration_ms
+                total_duration = get_total_audio_duration_ms(wav_path)
             except Exception as e:
                 print(f"[SiliconTTS] Warning: Could not get audio duration: {e}")
                 total_duration = 0
@@ -131,3 +283,97 @@ class SiliconAudioMethod(BaseMethod):
 
         except Exception as e:
             return {"ok": False, "artifacts": [], "meta": {}, "error": str(e)}
+
+    def run_grouped(self, items: list[Dict[str, Any]]) -> list[Dict[str, Any]]:
+        """
+        把连续同角色的 block 并成一次 TTS 调用，再按静音切回逐 block 的 wav。
+        items 为 run(**kw) 的参数 dict 列表（顺序即脚本顺序）。
+        切割失败（静音段不够）时自动退回逐条 run()。
+        """
+        results: list = [None] * len(items)
+
+        # 连续同角色分组
+        groups: list[list[int]] = []
+        for idx, item in enumerate(items):
+            character = getattr(item.get("block"), "character", None)
+            if groups and getattr(items[groups[-1][-1]].get("block"), "character", None) == character:
+                groups[-1].append(idx)
+            else:
+                groups.append([idx])
+
+        for group in groups:
+            if len(group) == 1:
+                results[group[0]] = self.run(**items[group[0]])
+                continue
+
+            texts = [
+                _get_voice_content(
+                    items[i].get("block"), items[i].get("text", ""), items[i].get("prompt", "")
+                ).strip()
+                for i in group
+            ]
+            character = getattr(items[group[0]].get("block"), "character", None)
+            cached = list_cached_voices()
+            if not character or character not in cached:
+                character = get_default_character()
+            voice_uri = ensure_voice_uri(character)
+
+            params = {**DEFAULT_SILICON_PARAMS, "input": _GROUP_SEPARATOR.join(texts)}
+            if voice_uri:
+                params["voice"] = voice_uri
+
+            first = items[group[0]]
+            project_dir = Path(first["workdir"]) / "project" / first["project"]
+            combined_path = project_dir / "audio" / f"_group_{group[0]:03d}.wav"
+            out_paths = [
+                project_dir / "audio" / f"{items[i]['target_name']}.wav" for i in group
+            ]
+
+            ok = _tts_silicon_request(params["input"], combined_path, params)
+            if ok and _split_wav_on_silence(combined_path, out_paths, texts):
+                combined_path.unlink(missing_ok=True)
+                from ..audio_engine.utils import get_audio_durations_ms
+                durations = get_audio_durations_ms(out_paths)
+                for i, wav_path, dur in zip(group, out_paths, durations):
+                    meta = {
+                        "project": items[i]["project"],
+                        "target_name": items[i]["target_name"],
+                        "character": character,
+                        "voice_uri": voice_uri,
+                        "audio_path": str(wav_path.relative_to(project_dir)),
+                        "total_duration": dur,
+                    }
+                    results[i] = {"ok": True, "artifacts": [str(wav_path)], "meta": meta, "error": None}
+            else:
+                # 分割信心不足：逐条重新合成，正确性优先
+                print(f"[SiliconTTS] ⚠️ Group synthesis fallback for blocks {group}.")
+                combined_path.unlink(missing_ok=True)
+                for i in group:
+                    results[i] = self.run(**items[i])
+
+        return results
+
+    def run_batch(self, items: list[Dict[str, Any]], *, concurrency: int = 8) -> list[bool]:
+        """
+        批量合成：items 为 [{"params": {...}, "out_path": Path}, ...]。
+        一个 aiohttp.ClientSession 并发打满 N 个 TTS 请求，
+        整段脚本的墙钟时间从 Σ延迟 降到 ≈ max延迟/并发数。
+        """
+        # aiohttp 为可选依赖：只有用到批量路径才 import
+        import aiohttp
+
+        async def _go() -> list[bool]:
+            sem = asyncio.Semaphore(max(1, concurrency))
+            connector = aiohttp.TCPConnector(limit=16, ttl_dns_cache=300)
+            headers = {
+                "Authorization": f"Bearer {SILICON_API_KEY}",
+                "Content-Type": "application/json",
+            }
+            async with aiohttp.ClientSession(connector=connector, headers=headers) as session:
+                tasks = [
+                    _tts_silicon_async(session, sem, Path(item["out_path"]), item["params"])
+                    for item in items
+                ]
+                return list(await asyncio.gather(*tasks))
+
+        return asyncio.run(_go())
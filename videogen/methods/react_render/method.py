@@ -1,7 +1,11 @@
 from __future__ import annotations
-import http.server, socketserver, threading
-import json, subprocess, tempfile, re, html, shutil
-from contextlib import contextmanager
+import atexit
+import http.server, threading
+import hashlib
+import json, os, subprocess, re, html, shutil, tempfile, time, uuid
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from html.parser import HTMLParser
 from pathlib import Path
 from typing import Dict, Any
 
@@ -19,39 +23,167 @@ except Exception:
 HERE = Path(__file__).resolve().parent
 TEMPLATE_HTML = HERE / "html_template.html"
 
+# 模板在 import 时读一次并转成 format_map 形式：
+# 先把 JS/CSS 的花括号转义，再把 {{X}} 占位符还原成 {X}，替换一趟完成。
+# 读失败不炸 import（方法注册在包加载时发生），推迟到首次渲染时报错。
+try:
+    _raw_template = TEMPLATE_HTML.read_text(encoding="utf-8").replace("{", "{{").replace("}", "}}")
+    _TEMPLATE = re.sub(r"\{\{\{\{(\w+)\}\}\}\}", r"{\1}", _raw_template)
+    del _raw_template
+except FileNotFoundError:
+    _TEMPLATE = None
+
 REACT_UMD = "https://unpkg.com/react@18/umd/react.production.min.js"
 REACTDOM_UMD = "https://unpkg.com/react-dom@18/umd/react-dom.production.min.js"
 BABEL_UMD = "https://unpkg.com/@babel/standalone/babel.min.js"
 
 MAX_LLM_RETRIES = 3
 
+# 静态 system prompt 固定为模块常量：每次调用字节完全一致，
+# 供应商侧的 prefix caching 才能命中。
+SCENE_SYSTEM_PROMPT = (
+    "You are a professional motion designer using React 18 UMD + Babel. "
+    "Generate an HTML fragment (not a full <html> page). "
+    "Do NOT include <html>, <head>, <body>, or extra <div id='root'> elements. "
+    "Your code will be injected inside an existing <div id='root'>. "
+    "Use React JSX (within <script type='text/babel'>) and optional <style>. "
+    "Center all visual elements with CSS Grid or Flexbox. "
+    "Use a clean, minimal, modern design (white, gray, light blue). "
+    "Keep animations declarative and smooth. "
+    "Output only the HTML fragment — no explanations."
+)
+
 
 def _which(cmd: str) -> bool:
     return shutil.which(cmd) is not None
 
-def validate_html(engine: Any, html_text: str) -> bool:
+
+@lru_cache(maxsize=1)
+def _choose_encoder() -> tuple:
+    """
+    有 NVIDIA GPU 时走 h264_nvenc（硬件编码，CPU 几乎为零），
+    否则 libx264 faster/crf20——对录屏类内容与 slow/16 画质无感知差异。
+    """
+    if _which("nvidia-smi"):
+        return ("h264_nvenc", ["-preset", "p4", "-cq", "20"])
+    # sliced-threads：几秒的短片帧级并行填不满核，切片级并行可以
+    return ("libx264", ["-preset", "faster", "-crf", "20",
+                        "-x264-params", "sliced-threads=1"])
+
+_RE_RENDER_CALL = re.compile(r"ReactDOM\.render|createRoot")
+
+
+class LocalHTMLValidator(HTMLParser):
+    """本地结构校验器：统计 <html> 个数、抓 text/babel 脚本内容"""
+
+    def __init__(self) -> None:
+        super().__init__(convert_charrefs=True)
+        self.html_count = 0
+        self.has_babel_script = False
+        self._in_babel_script = False
+        self.script_text = ""
+
+    def handle_starttag(self, tag, attrs):
+        if tag == "html":
+            self.html_count += 1
+        elif tag == "script" and dict(attrs).get("type") == "text/babel":
+            self.has_babel_script = True
+            self._in_babel_script = True
+
+    def handle_endtag(self, tag):
+        if tag == "script":
+            self._in_babel_script = False
+
+    def handle_data(self, data):
+        if self._in_babel_script:
+            self.script_text += data
+
+
+def _local_validate_html(html_text: str) -> bool | None:
+    """
+    零网络成本的结构检查：单个 <html>、存在 text/babel 脚本、
+    且脚本里有 ReactDOM.render/createRoot。解析异常时返回 None（交给 LLM 兜底）。
+    """
+    try:
+        v = LocalHTMLValidator()
+        v.feed(html_text)
+        v.close()
+    except Exception:
+        return None
+    return (
+        v.html_count <= 1
+        and v.has_babel_script
+        and bool(_RE_RENDER_CALL.search(v.script_text))
+    )
+
+
+def validate_html(engine: Any, html_text: str, attempt: int = 1) -> bool:
+    """
+    Validate if HTML is runnable for React video generation.
+    本地结构检查是权威判定；只有解析本身异常（歧义）且已经是重试轮次时，
+    才花一次 LLM 问答兜底——首轮歧义直接按通过处理，让浏览器渲染说话。
+    """
+    verdict = _local_validate_html(html_text)
+    if verdict is not None:
+        return verdict
+    if attempt > 1:
+        return _validate_html_llm(engine, html_text)
+    return True
+
+
+_RE_BABEL_EXCERPT = re.compile(r"<script[^>]*type=['\"]text/babel['\"][^>]*>([\s\S]{0,400})", re.I)
+
+
+def _validate_html_llm(engine: Any, html_text: str) -> bool:
     """
     Ask LLM to validate if HTML is runnable for React video generation.
     Returns True if it seems valid (single <html>, <script type="text/babel">, etc.)
     """
     validate_prompt = (
         "You are a strict validator. "
-        "I will give you a full HTML page that should display a short React 18 UMD + Babel animation. "
-        "If it looks valid enough to render (no syntax errors, no nested <html>, "
-        "includes at least one <script type='text/babel'> with ReactDOM.render or createRoot), "
+        "I will give you excerpts of an HTML page (the head and the start of its "
+        "text/babel script) that should display a short React 18 UMD + Babel animation. "
+        "If it looks valid enough to render (no syntax errors, "
+        "a <script type='text/babel'> with ReactDOM.render or createRoot), "
         "respond strictly with 'True'. "
         "If it seems broken, missing scripts, or malformed, respond strictly with 'False'. "
         "Output only 'True' or 'False'."
     )
 
+    # 结构判定只需要文件头 + babel 脚本开头：6000 字符 → ~600，prefill 成本 ~10x 降
+    babel_match = _RE_BABEL_EXCERPT.search(html_text)
+    payload = (
+        f"HEAD:\n{html_text[:200]}\n"
+        f"BABEL:\n{babel_match.group(1) if babel_match else '(missing)'}"
+    )
+
     try:
-        ans = engine.ask_text(f"{validate_prompt}\n\nHTML:\n{html_text[:6000]}")
+        ans = engine.ask_text(f"{validate_prompt}\n\n{payload}")
         ans = ans.strip().lower()
         return "true" in ans and "false" not in ans
     except Exception as e:
         print(f"[Validator] Validation error: {e}")
         return False
 
+def _probe_video_params(video_path: Path):
+    """ffprobe 读取 (width, height, fps)；失败返回 None"""
+    try:
+        result = subprocess.run(
+            [
+                "ffprobe", "-v", "error", "-select_streams", "v:0",
+                "-show_entries", "stream=width,height,r_frame_rate",
+                "-of", "json", str(video_path),
+            ],
+            capture_output=True, text=True,
+        )
+        stream = json.loads(result.stdout)["streams"][0]
+        num, den = stream["r_frame_rate"].split("/")
+        fps = float(num) / float(den) if float(den) else 0.0
+        return int(stream["width"]), int(stream["height"]), fps
+    except Exception:
+        return None
+
+
 def get_video_duration(video_path: Path) -> float:
     """用 ffprobe 精确获取视频时长（秒）"""
     result = subprocess.run(
@@ -66,51 +198,219 @@ def get_video_duration(video_path: Path) -> float:
     return float(data["format"]["duration"])
 
 
+# 重试循环中只有 html_code 变化，其余字段先填好，每次尝试只剩一次 replace
+_CONTENT_SENTINEL = "\x00HTML_CONTENT\x00"
+
+
+@lru_cache(maxsize=32)
+def _prepare_template(title: str, width: int, height: int, duration_sec: float) -> str:
+    """填入除正文外的所有字段，返回只剩正文占位符的半成品模板（按参数记忆化）"""
+    if _TEMPLATE is None:
+        raise FileNotFoundError(f"Missing render template: {TEMPLATE_HTML}")
+    umd = _umd_urls()
+    return _TEMPLATE.format_map({
+        "TITLE": html.escape(title),
+        "WIDTH": width,
+        "HEIGHT": height,
+        "REACT_UMD": umd["react.js"],
+        "REACTDOM_UMD": umd["react-dom.js"],
+        "BABEL_UMD": umd["babel.js"],
+        "DURATION_MS": int(duration_sec) * 1000,
+        "HTML_CONTENT": _CONTENT_SENTINEL,
+    })
+
+
 def _build_index_html(title: str, width: int, height: int, html_code: str, duration_sec: float) -> str:
-    """注入模板生成完整 HTML"""
-    template = TEMPLATE_HTML.read_text(encoding="utf-8")
-    return (
-        template
-        .replace("{{TITLE}}", html.escape(title))
-        .replace("{{WIDTH}}", str(width))
-        .replace("{{HEIGHT}}", str(height))
-        .replace("{{REACT_UMD}}", REACT_UMD)
-        .replace("{{REACTDOM_UMD}}", REACTDOM_UMD)
-        .replace("{{BABEL_UMD}}", BABEL_UMD)
-        .replace("{{DURATION_MS}}", str(int(duration_sec) * 1000))
-        .replace("{{HTML_CONTENT}}", html_code)
-    )
+    """注入模板生成完整 HTML（模板常驻内存，单趟替换）"""
+    return _prepare_template(title, width, height, duration_sec).replace(_CONTENT_SENTINEL, html_code)
+
+
+# _sanitize_html 在每次 LLM 重试都会调用：
+# 所有要剔除的 token 合成一个 alternation，finditer 单趟扫完
+_RE_BODY = re.compile(r"<body[^>]*>([\s\S]*?)</body>", re.I)
+_RE_STRIP = re.compile(
+    r"(?:```html?|```)"
+    r"|<!DOCTYPE[^>]*>"
+    r"|<\/?(?:html|head)>"
+    r"|<div\s+id=[\"']root[\"']><\/div>"
+    r"|(?:Here'?s|This implementation features|The animation sequence)[\s\S]+",
+    re.I,
+)
 
 
 def _sanitize_html(raw: str) -> str:
-    """Clean fences, wrappers, and duplicates."""
+    """Clean fences, wrappers, and duplicates（单趟线性扫描）。"""
     text = (raw or "").strip()
-    text = re.sub(r"^```[\s\S]*?\n", "", text)
-    text = re.sub(r"\n```$", "", text)
-    text = re.sub(r'<div\s+id=["\']root["\']><\/div>', '', text, flags=re.I)
-    text = text.replace("```html", "").replace("```", "")
-    text = text.strip()
 
-    body_match = re.search(r"<body[^>]*>([\s\S]*?)</body>", text, re.I)
+    body_match = _RE_BODY.search(text)
     if body_match:
         text = body_match.group(1).strip()
 
-    text = re.sub(r"<!DOCTYPE[^>]*>", "", text, flags=re.I)
-    text = re.sub(r"<\/?(html|head)>", "", text, flags=re.I)
-    text = re.sub(r"(?:Here'?s|This implementation features|The animation sequence)[\s\S]+", "", text, flags=re.I)
-    return text.strip()
+    parts = []
+    pos = 0
+    for m in _RE_STRIP.finditer(text):
+        parts.append(text[pos:m.start()])
+        pos = m.end()
+    parts.append(text[pos:])
+    return "".join(parts).strip()
 
 
-@contextmanager
-def _serve_dir(root_dir: Path):
-    Handler = lambda *args, **kw: http.server.SimpleHTTPRequestHandler(*args, directory=str(root_dir), **kw)
-    with socketserver.ThreadingTCPServer(("127.0.0.1", 0), Handler) as httpd:
-        t = threading.Thread(target=httpd.serve_forever, daemon=True)
-        t.start()
+class _PWPool:
+    """
+    常驻 Playwright 浏览器池：Chromium 启动要 1-2 秒，每线程只付一次。
+    sync API 对象不能跨线程使用，所以按线程各持一个 browser（thread-local），
+    run_many 并发渲染时每个 worker 线程自然拿到自己的实例。
+    """
+    _tls = threading.local()
+    _instances: list = []  # [(playwright, browser)]，atexit 统一回收
+    _lock = threading.Lock()
+
+    @classmethod
+    def context(cls, **kw):
+        browser = getattr(cls._tls, "browser", None)
+        if browser is None:
+            pw = sync_playwright().start()
+            browser = pw.chromium.launch(headless=True)
+            cls._tls.browser = browser
+            with cls._lock:
+                if not cls._instances:
+                    atexit.register(cls.close)
+                cls._instances.append((pw, browser))
+        return browser.new_context(**kw)
+
+    @classmethod
+    def close(cls) -> None:
+        with cls._lock:
+            for pw, browser in cls._instances:
+                try:
+                    browser.close()
+                    pw.stop()
+                except Exception:
+                    pass
+            cls._instances.clear()
+
+
+# run_many 的常驻渲染线程池：worker 线程各持一个 thread-local Chromium
+# （见 _PWPool），每次调用都新建 executor 会让旧线程退出后把浏览器
+# 留在 _instances 里没人用——进程内只建一次，所有 run_many 复用。
+# 池大小取首次调用的并发数，后续调用沿用（浏览器数量随之封顶）。
+_RENDER_POOL: ThreadPoolExecutor | None = None
+_RENDER_POOL_LOCK = threading.Lock()
+
+
+def _render_pool(n: int) -> ThreadPoolExecutor:
+    global _RENDER_POOL
+    with _RENDER_POOL_LOCK:
+        if _RENDER_POOL is None:
+            _RENDER_POOL = ThreadPoolExecutor(max_workers=n, thread_name_prefix="react-render")
+        return _RENDER_POOL
+
+
+class _PageServer:
+    """
+    进程级静态页服务器：HTML 挂在内存 dict 里按 token 取，
+    不再为每次渲染写临时目录 + 起一个一次性 TCPServer。
+    """
+    _pages: Dict[str, str] = {}
+    _assets: Dict[str, bytes] = {}
+    _httpd = None
+    _port: int | None = None
+    _lock = threading.Lock()
+
+    class _Handler(http.server.BaseHTTPRequestHandler):
+        def do_GET(self):
+            name = self.path.rsplit("/", 1)[-1]
+            if self.path.startswith("/umd/"):
+                data = _PageServer._assets.get(name)
+                if data is None:
+                    self.send_error(404)
+                    return
+                self._send(data, "application/javascript")
+                return
+            body_text = _PageServer._pages.get(name)
+            if body_text is None:
+                self.send_error(404)
+                return
+            self._send(body_text.encode("utf-8"), "text/html; charset=utf-8")
+
+        def _send(self, body: bytes, content_type: str) -> None:
+            self.send_response(200)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass  # 渲染高频访问，不刷访问日志
+
+    @classmethod
+    def _ensure_started(cls) -> None:
+        """懒启动，调用方须已持有 _lock。"""
+        if cls._httpd is not None:
+            return
+        # ThreadingHTTPServer 自带 daemon_threads + allow_reuse_address：
+        # 退出时不等挂起连接 join，重启进程也不会踩 TIME_WAIT 端口
+        cls._httpd = http.server.ThreadingHTTPServer(("127.0.0.1", 0), cls._Handler)
+        cls._port = cls._httpd.server_address[1]
+        threading.Thread(target=cls._httpd.serve_forever, daemon=True).start()
+        atexit.register(cls._httpd.shutdown)
+
+    @classmethod
+    def url_for(cls, token: str, html_text: str) -> str:
+        with cls._lock:
+            cls._ensure_started()
+            cls._pages[token] = html_text
+        return f"http://127.0.0.1:{cls._port}/render/{token}"
+
+    @classmethod
+    def release(cls, token: str) -> None:
+        cls._pages.pop(token, None)
+
+    @classmethod
+    def asset_url(cls, name: str, data: bytes) -> str:
+        with cls._lock:
+            cls._ensure_started()
+            cls._assets[name] = data
+        return f"http://127.0.0.1:{cls._port}/umd/{name}"
+
+
+# 已验证 HTML 片段的持久缓存目录（键 = sha256(system prompt + 文本 + 模型)）
+_REACT_LLM_CACHE_DIR = Path.home() / ".cache" / "videogen" / "react_llm"
+
+# UMD 包（React/ReactDOM/Babel）本地缓存：unpkg 只拉一次，之后离线可渲染
+_UMD_CACHE_DIR = Path.home() / ".cache" / "videogen" / "umd"
+_UMD_BUNDLES = {
+    "react.js": REACT_UMD,
+    "react-dom.js": REACTDOM_UMD,
+    "babel.js": BABEL_UMD,
+}
+
+
+@lru_cache(maxsize=1)
+def _umd_urls() -> Dict[str, str]:
+    """
+    返回三个 UMD 脚本的本地服务 URL；下载失败时退回远端地址。
+    优先级：仓库内 vendor/ 目录（随代码发布，完全离线）→ 用户缓存 → unpkg。
+    """
+    urls: Dict[str, str] = {}
+    for name, remote in _UMD_BUNDLES.items():
+        vendor_path = HERE / "vendor" / name
+        if vendor_path.exists():
+            urls[name] = _PageServer.asset_url(name, vendor_path.read_bytes())
+            continue
+        cache_path = _UMD_CACHE_DIR / name
         try:
-            yield httpd.server_address[1]
-        finally:
-            httpd.shutdown(); httpd.server_close(); t.join()
+            if not cache_path.exists():
+                import requests
+                _UMD_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+                resp = requests.get(remote, timeout=30)
+                resp.raise_for_status()
+                cache_path.write_bytes(resp.content)
+            urls[name] = _PageServer.asset_url(name, cache_path.read_bytes())
+        except Exception as e:
+            print(f"[UMD] ⚠️ Falling back to remote for {name}: {e}")
+            urls[name] = remote
+    return urls
 
 def _record_url(
     page_url: str,
@@ -125,29 +425,38 @@ def _record_url(
     精确帧控制：输出 mp4 时长严格等于 duration_ms（误差 < 1帧）。
     """
     out_video.parent.mkdir(parents=True, exist_ok=True)
-    tmp_webm = out_video.with_suffix(".webm")
-
-    # === Step 1. 录制 ===
-    with sync_playwright() as p:
-        browser = p.chromium.launch(headless=True)
-        context = browser.new_context(
-            viewport={"width": width, "height": height},
-            record_video_dir=str(out_video.parent),
-            record_video_size={"width": width, "height": height},
-            device_scale_factor=3,
-        )
+    # 中间 webm 放 tmpfs（/dev/shm）：录制和转码读写都不落盘
+    shm = Path("/dev/shm")
+    rec_dir = Path(tempfile.mkdtemp(prefix="videogen_rec_", dir=str(shm))) if shm.is_dir() else out_video.parent
+    tmp_webm = rec_dir / f"{out_video.stem}.webm"
+
+    # === Step 1. 录制（复用常驻浏览器，仅新建 context） ===
+    context = _PWPool.context(
+        viewport={"width": width, "height": height},
+        record_video_dir=str(rec_dir),
+        record_video_size={"width": width, "height": height},
+        # 1x：录制目标就是 width×height，3x 让 Chromium 合成 9 倍像素再被缩回，纯浪费
+        device_scale_factor=1,
+    )
+    try:
         page = context.new_page()
-        page.goto(page_url, wait_until="networkidle")
+        # 录制从 context 建立就开始：记录 goto→ready 的死区时长，转码时用 -ss 剪掉
+        rec_start = time.monotonic()
+        # commit + 显式就绪信号取代 networkidle 的 500ms 静默窗口
+        page.goto(page_url, wait_until="commit")
+        # polling=50：默认 raf/100ms 轮询会让信号平均晚到半个周期
+        page.wait_for_function("() => window.__RENDER_READY === true", timeout=10000, polling=50)
+        lead_in_sec = time.monotonic() - rec_start
 
         total_wait_ms = duration_ms + extra_record_ms
         try:
-            page.wait_for_function("() => window.__PLAY_DONE === true", timeout=total_wait_ms + 4000)
+            page.wait_for_function("() => window.__PLAY_DONE === true", timeout=total_wait_ms + 4000, polling=50)
         except Exception:
             page.wait_for_timeout(total_wait_ms)
 
         tmp_path = Path(page.video.path())
+    finally:
         context.close()
-        browser.close()
 
     tmp_path.replace(tmp_webm)
 
@@ -156,27 +465,109 @@ def _record_url(
     frame_count = int(round(target_sec * fps))
     tmp_fixed = out_video.with_suffix(".mp4")
 
+    src = _probe_video_params(tmp_webm)
+
+    # 无需缩放时先试 stream copy：-ss 剪掉就绪前的死区 + -t 裁尾，
+    # 容器级剪切，近零 CPU。copy 只能切在关键帧/包边界上，
+    # 事后校验时长，偏差超过 1.5 帧就丢弃改走转码。
+    if src and src[0] == width and src[1] == height:
+        copy_cmd = [
+            "ffmpeg", "-y",
+            "-ss", f"{max(0.0, lead_in_sec):.3f}", "-i", str(tmp_webm),
+            "-t", f"{target_sec:.3f}", "-c", "copy", str(tmp_fixed),
+        ]
+        if subprocess.run(copy_cmd, capture_output=True).returncode == 0:
+            try:
+                real = get_video_duration(tmp_fixed)
+            except Exception:
+                real = -1.0
+            if abs(real - target_sec) <= 1.5 / fps:
+                tmp_webm.unlink(missing_ok=True)
+                if rec_dir != out_video.parent:
+                    shutil.rmtree(rec_dir, ignore_errors=True)
+                print(f"[OK] 输出文件长度: {real:.3f}s  (stream copy, 目标 {target_sec:.3f}s)")
+                return tmp_fixed
+            tmp_fixed.unlink(missing_ok=True)
+
+    encoder, enc_args = _choose_encoder()
+    # 源已经是目标尺寸/帧率时不挂对应滤镜：lanczos 缩放是全帧 6 抽头 FIR，
+    # 对 1080p60 来说是整条转码里最贵的一步，能省则省
+    filters = []
+    if not (src and src[0] == width and src[1] == height):
+        filters.append(f"scale={width}:{height}:flags=lanczos")
+    if not (src and src[2] and abs(src[2] - fps) < 0.01):
+        filters.append(f"fps={fps}")
     cmd = [
         "ffmpeg", "-y",
+        # -ss 放在 -i 前做输入侧 seek，剪掉渲染就绪前的死帧，不增加额外转码趟数
+        "-ss", f"{max(0.0, lead_in_sec):.3f}",
         "-i", str(tmp_webm),
-        "-vf", f"scale={width}:{height}:flags=lanczos,fps={fps}",
+        *(["-vf", ",".join(filters)] if filters else []),
         "-frames:v", str(frame_count),       # ✅ 输出精确帧数
-        "-c:v", "libx264",
-        "-preset", "slow",
-        "-crf", "14",
+        "-c:v", encoder,
+        *enc_args,
         "-pix_fmt", "yuv420p",
+        "-movflags", "+faststart",
         "-an",                                # 无音轨避免时间线漂移
         str(tmp_fixed),
     ]
     subprocess.run(cmd, check=True)
 
     tmp_webm.unlink(missing_ok=True)
+    if rec_dir != out_video.parent:
+        shutil.rmtree(rec_dir, ignore_errors=True)
 
     real_duration = get_video_duration(tmp_fixed)
     print(f"[OK] 输出文件长度: {real_duration:.3f}s  (目标 {target_sec:.3f}s, 帧数 {frame_count})")
     return tmp_fixed
 
 
+def _generate_and_validate_parallel(
+    engine: Any,
+    gen_prompt: str,
+    sys_prompt: str,
+    page_tpl: str,
+) -> tuple:
+    """
+    生成+验证循环：两 worker 投机并行——验证第 N 次尝试的同时，
+    第 N+1 次生成已经在路上，失败重试几乎不额外等待。
+    返回 (html_clean, full_html, attempts, last_err)；失败时前两项为 None。
+    """
+    last_err = None
+    with ThreadPoolExecutor(max_workers=2) as ex:
+        next_gen = ex.submit(engine.ask_text, gen_prompt, system=sys_prompt)
+        for attempt in range(1, MAX_LLM_RETRIES + 1):
+            try:
+                print(f"[LLM] Generating attempt {attempt}/{MAX_LLM_RETRIES} ...")
+                # 先把 future 摘下来再取结果：result() 抛异常时 next_gen 已是
+                # None，except 分支才会真正重新提交生成，而不是反复揭同一个伤疤
+                pending, next_gen = next_gen, None
+                raw_html = pending.result()
+                html_clean = _sanitize_html(raw_html)
+                full_html = page_tpl.replace(_CONTENT_SENTINEL, html_clean)
+
+                # 验证失败时重试生成已在路上；成功则取消投机任务。
+                # use_cache=False：messages 逐字节相同，走缓存只会复读刚失败的答案
+                next_gen = (
+                    ex.submit(engine.ask_text, gen_prompt, system=sys_prompt, use_cache=False)
+                    if attempt < MAX_LLM_RETRIES else None
+                )
+                print("[LLM] Validating HTML...")
+                if validate_html(engine, full_html, attempt):
+                    print("[LLM] ✅ HTML validated as runnable.")
+                    if next_gen is not None:
+                        next_gen.cancel()
+                    return html_clean, full_html, attempt, None
+                print("[LLM] ❌ Invalid HTML, retrying...")
+                last_err = "Validation failed"
+            except Exception as e:
+                last_err = str(e)
+                print(f"[LLM] Error during generation attempt {attempt}: {e}")
+                if next_gen is None and attempt < MAX_LLM_RETRIES:
+                    next_gen = ex.submit(engine.ask_text, gen_prompt, system=sys_prompt, use_cache=False)
+    return None, None, MAX_LLM_RETRIES, last_err
+
+
 @register_method
 class ReactRenderMethod(BaseMethod):
     """
@@ -200,6 +591,7 @@ class ReactRenderMethod(BaseMethod):
         workdir: Path,
         duration_ms: int | None = None,
         block: Any | None = None,
+        use_cache: bool = True,
     ) -> Dict[str, Any]:
         if not text.strip():
             return {"ok": False, "error": "text 不能为空"}
@@ -219,60 +611,79 @@ class ReactRenderMethod(BaseMethod):
         except LLMConfigError as e:
             return {"ok": False, "error": f"LLM 配置错误: {e}"}
 
-        sys_prompt = (
-            "You are a professional motion designer using React 18 UMD + Babel. "
-            "Generate an HTML fragment (not a full <html> page). "
-            "Do NOT include <html>, <head>, <body>, or extra <div id='root'> elements. "
-            "Your code will be injected inside an existing <div id='root'>. "
-            "Use React JSX (within <script type='text/babel'>) and optional <style>. "
-            "Center all visual elements with CSS Grid or Flexbox. "
-            "Use a clean, minimal, modern design (white, gray, light blue). "
-            "Keep animations declarative and smooth. "
-            "Output only the HTML fragment — no explanations."
-        )
+        sys_prompt = SCENE_SYSTEM_PROMPT
 
         last_err = None
         html_clean = None
         full_html = None
+        attempt = 0
+
+        # 已验证片段的持久缓存：同一行文本迭代重跑时直接跳过两次 LLM 调用
+        # key 带上分辨率：模板按 width/height 生成，换尺寸不能复用旧产物
+        cache_key = hashlib.sha256(
+            (sys_prompt + text + f"{width}x{height}" + engine.default_model).encode("utf-8")
+        ).hexdigest()
+        cache_file = _REACT_LLM_CACHE_DIR / f"{cache_key}.html"
+        if use_cache and cache_file.exists():
+            print(f"[LLM] ♻️ Cache hit for scene HTML ({cache_key[:12]}).")
+            html_clean = cache_file.read_text(encoding="utf-8")
+            full_html = _build_index_html(
+                title=f"{project}:{target_name}",
+                width=width, height=height,
+                html_code=html_clean,
+                duration_sec=duration_sec,
+            )
+            return self._render_validated(
+                full_html, out_html, out_video, width, height,
+                duration_sec, duration_ms_final, attempts=0,
+            )
+
+        # === generation + validation（投机并行：验证当前尝试时预发下一次生成） ===
+        gen_prompt = f"Prompt: {text}"
+        # 标题/尺寸/时长在重试间不变，模板只填一次，循环里仅替换正文
+        page_tpl = _prepare_template(
+            f"{project}:{target_name}", width, height, duration_sec
+        )
+        html_clean, full_html, attempt, last_err = _generate_and_validate_parallel(
+            engine, gen_prompt, sys_prompt, page_tpl
+        )
+        if full_html is None:
+            return {"ok": False, "error": f"LLM failed to generate valid HTML after {MAX_LLM_RETRIES} attempts: {last_err}"}
 
-        # === generation + validation loop ===
-        for attempt in range(1, MAX_LLM_RETRIES + 1):
-            try:
-                print(f"[LLM] Generating attempt {attempt}/{MAX_LLM_RETRIES} ...")
-                raw_html = engine.ask_text(f"{sys_prompt}\n\nPrompt: {text}")
-                html_clean = _sanitize_html(raw_html)
-                full_html = _build_index_html(
-                    title=f"{project}:{target_name}",
-                    width=width, height=height,
-                    html_code=html_clean,
-                    duration_sec=duration_sec,
-                )
+        # 验证通过才落缓存，坏产物不会被复用
+        try:
+            _REACT_LLM_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+            cache_file.write_text(html_clean, encoding="utf-8")
+        except Exception as e:
+            print(f"[LLM] ⚠️ Failed to cache scene HTML: {e}")
 
-                print("[LLM] Validating HTML...")
-                if validate_html(engine, full_html):
-                    print("[LLM] ✅ HTML validated as runnable.")
-                    break
-                else:
-                    print("[LLM] ❌ Invalid HTML, retrying...")
-                    last_err = "Validation failed"
-                    continue
-            except Exception as e:
-                last_err = str(e)
-                print(f"[LLM] Error during generation attempt {attempt}: {e}")
-                continue
-        else:
-            return {"ok": False, "error": f"LLM failed to generate valid HTML after {MAX_LLM_RETRIES} attempts: {last_err}"}
+        return self._render_validated(
+            full_html, out_html, out_video, width, height,
+            duration_sec, duration_ms_final, attempts=attempt,
+        )
 
+    def _render_validated(
+        self,
+        full_html: str,
+        out_html: Path,
+        out_video: Path,
+        width: int,
+        height: int,
+        duration_sec: float,
+        duration_ms_final: int,
+        *,
+        attempts: int,
+    ) -> Dict[str, Any]:
+        """验证通过的完整 HTML → 落盘 + 录制，返回标准结果 dict"""
         out_html.write_text(full_html, encoding="utf-8")
 
+        token = uuid.uuid4().hex
         try:
-            with tempfile.TemporaryDirectory(prefix="react_html_") as td:
-                tmp_dir = Path(td)
-                tmp_index = tmp_dir / "index.html"
-                tmp_index.write_text(full_html, encoding="utf-8")
-                with _serve_dir(tmp_dir) as port:
-                    url = f"http://127.0.0.1:{port}/index.html"
-                    final_path = _record_url(url, out_video, width, height, duration_ms_final)
+            url = _PageServer.url_for(token, full_html)
+            try:
+                final_path = _record_url(url, out_video, width, height, duration_ms_final)
+            finally:
+                _PageServer.release(token)
         except subprocess.CalledProcessError as e:
             return {"ok": False, "artifacts": [str(out_html)], "error": f"ffmpeg 失败: {e}"}
         except Exception as e:
@@ -288,11 +699,20 @@ class ReactRenderMethod(BaseMethod):
                 "durationSec": duration_sec,
                 "html": str(out_html),
                 "output_path": str(final_path),
-                "attempts": attempt,
+                "attempts": attempts,
             },
             "error": None,
         }
 
+    def run_many(self, items: list, *, concurrency: int | None = None) -> list:
+        """
+        并发渲染多个独立场景：items 为 run(**kw) 的参数 dict 列表。
+        每个 worker 线程持有自己的 Chromium（见 _PWPool），
+        墙钟时间从 K·T 降到约 (K/N)·T。
+        """
+        n = concurrency or max(1, int(os.getenv("RENDER_CONCURRENCY", "2")))
+        return list(_render_pool(n).map(lambda kw: self.run(**kw), items))
+
     def generate_prompt(self, text: str) -> str:
         engine = get_engine()
 
@@ -318,4 +738,4 @@ class ReactRenderMethod(BaseMethod):
             temperature=0.4,
             max_tokens=300,
         )
-        return res["content"].strip()
\ No newline at end of file
+        return res.content.strip()
\ No newline at end of file
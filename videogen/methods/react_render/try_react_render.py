@@ -1,12 +1,28 @@
 #!/usr/bin/env python3
 from __future__ import annotations
 import argparse
+import os
+import subprocess
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from pathlib import Path
 from typing import List, Dict, Any
 
 from method import ReactRenderMethod
 
 
+def _run_one(sc: Dict[str, Any], out_root: Path, project: str) -> Dict[str, Any]:
+    """单场景 worker：方法对象在子进程内构造（浏览器/服务器均为进程内单例）"""
+    m = ReactRenderMethod()
+    return m.run(
+        prompt=sc["narration"],
+        project=project,
+        target_name=sc["name"],
+        text=sc["text"],
+        workdir=out_root,
+        duration_ms=sc["duration_ms"],
+    )
+
+
 def _pick_video_artifact(artifacts: List[str]) -> Path:
     """从 artifacts 里挑出视频文件（.mp4 或 .webm）。"""
     for p in artifacts:
@@ -24,8 +40,6 @@ def test_llm_render_suite(out_root: Path) -> None:
     """
     print("[Test] Starting LLM React rendering suite...")
 
-    m = ReactRenderMethod()
-
     # 4 个示例场景（你可按需增删改）
     scenarios: List[Dict[str, Any]] = [
         {
@@ -71,31 +85,52 @@ def test_llm_render_suite(out_root: Path) -> None:
 
     project = "react_suite_tests"
 
-    for i, sc in enumerate(scenarios, 1):
-        print(f"\n[Test] Running scenario {i}/{len(scenarios)}: {sc['name']} ...")
-        res = m.run(
-            prompt=sc["narration"],
-            project=project,
-            target_name=sc["name"],
-            text=sc["text"],
-            workdir=out_root,
-            duration_ms=sc["duration_ms"],
-        )
-
-        if not res.get("ok"):
-            raise SystemExit(f"[Error] Scenario '{sc['name']}' failed: {res.get('error')}")
-
-        artifacts = res.get("artifacts", [])
-        if not artifacts:
-            raise SystemExit(f"[Error] Scenario '{sc['name']}' returned no artifacts")
-
-        video_path = _pick_video_artifact(artifacts)
-        html_path = next((Path(p) for p in artifacts if p.endswith("index.html")), None)
-
-        size = video_path.stat().st_size if video_path.exists() else 0
-        print(f"[OK] {sc['name']}: video={video_path} size={size} bytes; html={html_path}")
-        meta = res.get("meta", {})
-        print(f"[Meta] durationMs={meta.get('durationMs')} tool={meta.get('syntax_tool')} attempts={meta.get('attempts')}")
+    # 场景彼此独立（各自的 LLM 调用 + 浏览器录制 + ffmpeg）：进程池并行。
+    # ffmpeg 本身多线程，worker 数压到物理核的一半避免过订阅。
+    max_workers = min(len(scenarios), max(1, (os.cpu_count() or 2) // 2))
+    videos: Dict[str, Path] = {}
+    with ProcessPoolExecutor(max_workers=max_workers) as ex:
+        futures = {
+            ex.submit(_run_one, sc, out_root, project): sc for sc in scenarios
+        }
+        for fut in as_completed(futures):
+            sc = futures[fut]
+            res = fut.result()
+
+            if not res.get("ok"):
+                raise SystemExit(f"[Error] Scenario '{sc['name']}' failed: {res.get('error')}")
+
+            artifacts = res.get("artifacts", [])
+            if not artifacts:
+                raise SystemExit(f"[Error] Scenario '{sc['name']}' returned no artifacts")
+
+            video_path = _pick_video_artifact(artifacts)
+            videos[sc["name"]] = video_path
+            html_path = next((Path(p) for p in artifacts if p.endswith("index.html")), None)
+
+            size = video_path.stat().st_size if video_path.exists() else 0
+            print(f"[OK] {sc['name']}: video={video_path} size={size} bytes; html={html_path}")
+            meta = res.get("meta", {})
+            print(f"[Meta] durationMs={meta.get('durationMs')} tool={meta.get('syntax_tool')} attempts={meta.get('attempts')}")
+
+    # 四段走的是同一条 _record_url 编码参数，拼接用 concat demuxer 流拷贝：
+    # 纯容器级复制，不再多跑一遍编码
+    suite_dir = out_root / "project" / project
+    concat_txt = suite_dir / "concat.txt"
+    concat_txt.write_text(
+        "".join(f"file '{videos[sc['name']]}'\n" for sc in scenarios),
+        encoding="utf-8",
+    )
+    suite_mp4 = suite_dir / "suite.mp4"
+    cmd = [
+        "ffmpeg", "-y", "-f", "concat", "-safe", "0",
+        "-i", str(concat_txt), "-c", "copy", str(suite_mp4),
+    ]
+    res = subprocess.run(cmd, capture_output=True, text=True)
+    if res.returncode == 0:
+        print(f"[OK] Suite concat: {suite_mp4} ({suite_mp4.stat().st_size} bytes)")
+    else:
+        print(f"[Warn] Suite concat failed: {res.stderr.strip()[-300:]}")
 
 
 def main():
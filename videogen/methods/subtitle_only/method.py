@@ -1,5 +1,5 @@
 from __future__ import annotations
-import subprocess, textwrap
+import os, subprocess, tempfile, textwrap
 from pathlib import Path
 from typing import Dict, Any
 from ..base import BaseMethod
@@ -57,15 +57,20 @@ class SubtitleOnlyMethod(BaseMethod):
         # === 文本处理 ===
         # 自动换行防止太长溢出
         safe_text = textwrap.fill(text.strip(), width=28)
-        # 转义特殊字符
-        escaped = safe_text.replace("'", r"\'").replace(":", "\\:")
 
         # === FFmpeg filter ===
+        # textfile= 旁路文件代替手工转义：反斜杠/百分号/换行/emoji 都不会炸 filter 串
+        with tempfile.NamedTemporaryFile(
+            "w", suffix=".txt", delete=False, encoding="utf-8"
+        ) as f:
+            f.write(safe_text)
+            text_path = f.name
+
         # 控制文本宽度限制 + 留白区域
         max_text_w_ratio = 0.7  # 文本最多占屏幕70%
         drawtext_filter = (
             f"drawtext=fontfile='{font_path}':"
-            f"text='{escaped}':"
+            f"textfile='{text_path}':reload=0:"
             f"fontcolor={font_color}:fontsize={font_size}:"
             f"x=(w*{(1 - max_text_w_ratio) / 2})+(w*{max_text_w_ratio}-text_w)/2:"
             f"y=(h-text_h)/2:"
@@ -73,14 +78,29 @@ class SubtitleOnlyMethod(BaseMethod):
         )
 
         # === FFmpeg 命令 ===
-        cmd = [
+        # 每一帧都相同：drawtext 只渲染一次到 PNG，再 -loop 1 循环编码。
+        # 避免 libavfilter 每秒 30 次重画同一段文字。
+        frame_png = out_dir / f"{target_name}_frame.png"
+        render_cmd = [
             "ffmpeg",
             "-y",
             "-f", "lavfi",
-            "-i", f"color=c={bg_color}:s={width}x{height}:d={duration_sec}",
+            "-i", f"color=c={bg_color}:s={width}x{height}:d=1",
             "-vf", drawtext_filter,
+            "-vframes", "1",
+            str(frame_png),
+        ]
+        encode_cmd = [
+            "ffmpeg",
+            "-y",
+            "-loop", "1",
+            "-i", str(frame_png),
+            "-t", f"{duration_sec}",
             "-r", "30",
             "-c:v", "libx264",
+            # 静态画面：ultrafast + stillimage，编码器全程输出 skip 宏块
+            "-preset", "ultrafast",
+            "-tune", "stillimage",
             "-pix_fmt", "yuv420p",
             "-movflags", "+faststart",
             str(out_mp4),
@@ -88,7 +108,8 @@ class SubtitleOnlyMethod(BaseMethod):
 
         # === 执行 ===
         try:
-            subprocess.run(cmd, check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+            for cmd in (render_cmd, encode_cmd):
+                subprocess.run(cmd, check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
         except subprocess.CalledProcessError as e:
             err = e.stderr.decode(errors="ignore")[-500:]
             return {
@@ -97,6 +118,9 @@ class SubtitleOnlyMethod(BaseMethod):
                 "meta": {},
                 "error": f"ffmpeg failed: {err}",
             }
+        finally:
+            os.unlink(text_path)
+            frame_png.unlink(missing_ok=True)
 
         return {
             "ok": True,
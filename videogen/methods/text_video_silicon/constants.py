@@ -14,6 +14,14 @@ POLL_INTERVAL_SEC = 8
 MAX_POLLS_PER_TASK = 120
 CSV_FILENAME = "tasks.csv"
 
+# 任务表的固定列序（落盘/导出用；未知列追加在末尾）
+CSV_FIELDS = [
+    "request_id", "project", "target_name", "prompt", "model",
+    "status", "output_path", "source_url", "created_ts", "updated_ts",
+    "error", "poll_count", "workdir", "duration",
+    "next_poll_ts", "backoff_sec",
+]
+
 DB_PATH = './db/video_download.csv'
 
 # 状态
@@ -1,6 +1,8 @@
 from __future__ import annotations
 
+import hashlib
 import os.path
+import re
 import time
 from pathlib import Path
 from typing import Dict, Any, Optional
@@ -10,13 +12,33 @@ from videogen.methods.registry import register_method
 from videogen.methods.text_video_silicon.constants import (
     SILICONFLOW_API_TOKEN, TEXT_TO_VIDEO_MODEL, DB_PATH, STATUS_SUBMITTED
 )
-from .sf_api import submit_video
-from .store import TaskCSV
+from .sf_api import submit_video, submit_videos_batch
+from .store import TaskCSV, make_store
 from .worker import start_background_worker
 from ...llm_engine import get_engine
 from ...pipeline.schema import ScriptBlock
 
 
+# 场景 prompt 的持久缓存：同一行台词重跑/重试时不再打 LLM。
+# 系统 prompt 改动时把版本号 +1，旧缓存整体失效。
+_PROMPT_SYS_VER = "v1"
+_PROMPT_CACHE_DIR = Path.home() / ".cache" / "videogen" / "scene_prompts"
+
+# LLM 输出里偶尔带的 "Title: ..." 行，一次多行正则扫掉
+_TITLE_RE = re.compile(r"^[ \t]*title:.*(?:\n|$)", re.IGNORECASE | re.MULTILINE)
+
+
+def _exists_cached(path: str, _cache: Dict[str, tuple] = {}) -> bool:
+    """os.path.exists 加 1s TTL 缓存：同一路径在一次 run 里只 stat 一次。"""
+    now = time.monotonic()
+    hit = _cache.get(path)
+    if hit is not None and now - hit[0] < 1.0:
+        return hit[1]
+    result = os.path.exists(path)
+    _cache[path] = (now, result)
+    return result
+
+
 @register_method
 class TextVideoSilicon(BaseMethod):
     NAME = "text_video"
@@ -25,16 +47,28 @@ class TextVideoSilicon(BaseMethod):
     def __init__(self) -> None:
         super().__init__()
         self._stores = {}
+        # resolve() 每次都按路径分量 stat 一遍，热路径上缓存结果
+        self._db_path = Path(DB_PATH).resolve()
+        self._resolved_workdirs: Dict[str, str] = {}
+
+    def _resolve_workdir(self, workdir: Path) -> str:
+        key = str(workdir)
+        hit = self._resolved_workdirs.get(key)
+        if hit is None:
+            hit = self._resolved_workdirs[key] = str(workdir.resolve())
+        return hit
 
     def _get_store(self, workdir: Path) -> TaskCSV:
         key = "global_db"
         if key not in self._stores:
-            db_path = Path(DB_PATH).resolve()
+            db_path = self._db_path
             db_path.parent.mkdir(parents=True, exist_ok=True)
-            store = TaskCSV(db_path)
-            self._stores[key] = store
-            start_background_worker(store)
-        return self._stores[key]
+            self._stores[key] = make_store(db_path)
+        store = self._stores[key]
+        # 每次取 store 都确保 worker 在跑：全部任务完成后 _loop 会退出，
+        # 之后再提交的块要能重新拉起轮询线程（内部有启动去重）
+        start_background_worker(store)
+        return store
 
     def run(
         self,
@@ -50,15 +84,36 @@ class TextVideoSilicon(BaseMethod):
         if not SILICONFLOW_API_TOKEN:
             return {"ok": False, "artifacts": [], "meta": {}, "error": "Missing SILICONFLOW_API_TOKEN."}
 
+        store = self._get_store(workdir)
+
+        # 先查库：同 (project, target_name, prompt) 已有成功产物就直接复用，
+        # 不提交也不等待
+        psha = hashlib.sha1(prompt.encode("utf-8")).hexdigest()
+        done = store.find_completed(project, target_name, psha)
+        if done and _exists_cached(done["output_path"]):
+            print(f"[TextVideo] ♻️ Reusing completed video for {target_name}: {done['output_path']}")
+            return {
+                "ok": True,
+                "artifacts": [done["output_path"]],
+                "meta": {
+                    "request_id": done.get("request_id", ""),
+                    "project": project,
+                    "target_name": target_name,
+                    "status": done.get("status", ""),
+                    "output_path": done["output_path"],
+                    "source_url": done.get("source_url", ""),
+                    "cached": True,
+                },
+                "error": None,
+            }
+
         # 提交任务
-        if block and block.generation and block.generation.ok and 'request_id' in block.generation.meta and os.path.exists(block.generation.meta['output_path']):
+        if block and block.generation and block.generation.ok and 'request_id' in block.generation.meta and _exists_cached(block.generation.meta['output_path']):
             request_id = block.generation.meta['request_id']
         else:
             request_id = submit_video(prompt)
         if not request_id:
             return {"ok": False, "artifacts": [], "meta": {}, "error": "Submit failed (no requestId)."}
-
-        store = self._get_store(workdir)
         now = time.time()
         row = {
             "request_id": request_id,
@@ -73,21 +128,24 @@ class TextVideoSilicon(BaseMethod):
             "updated_ts": str(now),
             "error": "",
             "poll_count": "0",
-            "workdir": str(workdir.resolve()),
+            "workdir": self._resolve_workdir(workdir),
             "duration": str(duration_ms / 1000 if duration_ms else 5.0),
         }
         store.upsert(row)
 
-        # Always wait for completion for text_video_silicon method
+        return self._await_result(store, request_id, project, target_name)
+
+    def _await_result(self, store: TaskCSV, request_id: str, project: str, target_name: str) -> Dict[str, Any]:
+        """阻塞等待任务终态并组装结果 dict（run / run_batch 共用）。"""
         print(f"⏳ Waiting for video generation to complete for {target_name}...")
         completed_task = store.wait_for_completion(request_id, timeout_seconds=300)
-        
+
         if completed_task:
             status = completed_task.get("status", "")
             output_path = completed_task.get("output_path", "")
             error = completed_task.get("error", "")
             
-            if status == "succeed" and output_path and os.path.exists(output_path):
+            if status == "succeed" and output_path and _exists_cached(output_path):
                 return {
                     "ok": True,
                     "artifacts": [output_path],
@@ -128,6 +186,52 @@ class TextVideoSilicon(BaseMethod):
                 "error": f"Timeout waiting for task completion (300s)",
             }
 
+    def run_batch(self, items: list[Dict[str, Any]]) -> list[Dict[str, Any]]:
+        """
+        批量版 run：先并发提交拿到全部 request_id，一次 upsert_many 入库，
+        再逐个等待终态。items 的键与 run 的关键字参数一致，结果同序。
+        """
+        if not SILICONFLOW_API_TOKEN:
+            err = {"ok": False, "artifacts": [], "meta": {}, "error": "Missing SILICONFLOW_API_TOKEN."}
+            return [dict(err) for _ in items]
+
+        request_ids = submit_videos_batch([it["prompt"] for it in items])
+
+        store = self._get_store(Path(items[0]["workdir"])) if items else None
+        now = time.time()
+        rows = []
+        for it, rid in zip(items, request_ids):
+            if not rid:
+                continue
+            workdir = Path(it["workdir"])
+            duration_ms = it.get("duration_ms")
+            rows.append({
+                "request_id": rid,
+                "project": it["project"],
+                "target_name": it["target_name"],
+                "prompt": it["prompt"],
+                "model": TEXT_TO_VIDEO_MODEL,
+                "status": STATUS_SUBMITTED,
+                "output_path": "",
+                "source_url": "",
+                "created_ts": str(now),
+                "updated_ts": str(now),
+                "error": "",
+                "poll_count": "0",
+                "workdir": self._resolve_workdir(workdir),
+                "duration": str(duration_ms / 1000 if duration_ms else 5.0),
+            })
+        if rows:
+            store.upsert_many(rows)
+
+        results: list[Dict[str, Any]] = []
+        for it, rid in zip(items, request_ids):
+            if not rid:
+                results.append({"ok": False, "artifacts": [], "meta": {}, "error": "Submit failed (no requestId)."})
+                continue
+            results.append(self._await_result(store, rid, it["project"], it["target_name"]))
+        return results
+
     def generate_prompt(self, text: str) -> str:
         """
         Convert a line of dialogue into a vivid cinematic scene prompt for text-to-video models (e.g. Sora, Runway).
@@ -135,6 +239,15 @@ class TextVideoSilicon(BaseMethod):
         """
         engine = get_engine()
 
+        cache_key = hashlib.sha1(
+            f"{_PROMPT_SYS_VER}|{text.strip()}".encode("utf-8")
+        ).hexdigest()
+        cache_file = _PROMPT_CACHE_DIR / f"{cache_key}.txt"
+        if cache_file.exists():
+            cached = cache_file.read_text(encoding="utf-8").strip()
+            if cached:
+                return cached
+
         system_prompt = (
             "You are an expert cinematic visual director who converts dialogue lines "
             "into vivid scene descriptions for text-to-video generation models like Sora or Runway.\n"
@@ -165,11 +278,15 @@ class TextVideoSilicon(BaseMethod):
             max_tokens=400,
         )
 
-        content = res["content"].strip()
+        content = res.content.strip()
 
+        prompt = _TITLE_RE.sub("", content).strip()
 
-        prompt = "\n".join(
-            l for l in content.splitlines() if not l.strip().lower().startswith("title:")
-        ).strip()
+        if prompt:
+            try:
+                _PROMPT_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+                cache_file.write_text(prompt, encoding="utf-8")
+            except Exception as e:
+                print(f"[TextVideo] ⚠️ Failed to cache scene prompt: {e}")
 
         return prompt
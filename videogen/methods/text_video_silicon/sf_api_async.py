@@ -0,0 +1,52 @@
+from __future__ import annotations
+import asyncio
+from typing import Any, Dict, List
+
+from .constants import (
+    SILICONFLOW_API_TOKEN, SILICONFLOW_STATUS_URL,
+    DEFAULT_HEADERS, REQUEST_TIMEOUT,
+)
+
+
+async def check_status_async(session, request_id: str) -> Dict[str, Any]:
+    """单任务异步查询，语义与 sf_api.check_status 一致。"""
+    if not SILICONFLOW_API_TOKEN:
+        return {"status": "Error", "error": "Missing API token"}
+    try:
+        async with session.post(
+            SILICONFLOW_STATUS_URL,
+            json={"requestId": request_id},
+        ) as r:
+            if r.status != 200:
+                return {"status": "Error", "error": f"HTTP {r.status}: {await r.text()}"}
+            return await r.json()
+    except Exception as e:
+        return {"status": "Error", "error": f"Request failed: {e}"}
+
+
+def check_statuses(request_ids: List[str], concurrency: int = 64) -> List[Dict[str, Any]]:
+    """
+    一个事件循环查一整批状态：几百个在途任务也只占一个线程，
+    HTTP 并发由 TCPConnector 限流。结果与输入同序。
+    aiohttp 为可选依赖（惰性导入），未安装时退回逐个同步查询。
+    """
+    if not request_ids:
+        return []
+    try:
+        import aiohttp
+    except ImportError:
+        from .sf_api import check_status
+        print("[sf_api] ⚠️ aiohttp 未安装，退回同步逐个查询")
+        return [check_status(rid) for rid in request_ids]
+
+    async def _poll_all() -> List[Dict[str, Any]]:
+        connector = aiohttp.TCPConnector(limit=concurrency, keepalive_timeout=60)
+        timeout = aiohttp.ClientTimeout(total=REQUEST_TIMEOUT)
+        async with aiohttp.ClientSession(
+            headers=DEFAULT_HEADERS, connector=connector, timeout=timeout
+        ) as session:
+            return list(await asyncio.gather(
+                *(check_status_async(session, rid) for rid in request_ids)
+            ))
+
+    return asyncio.run(_poll_all())
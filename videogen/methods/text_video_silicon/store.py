@@ -1,78 +1,452 @@
-import csv, threading, time
+import atexit
+import csv, hashlib, io, json, os, sqlite3, threading, time
 from pathlib import Path
 from typing import Dict, List, Optional
 
+from .constants import CSV_FIELDS, TERMINAL
+
+
+# 互斥锁按「解析后的路径」共享：锁住的是磁盘上那份文件，而不是某个
+# 实例——即使有代码绕过 make_store 直接构造 store，同路径也互斥
+_PATH_LOCKS: Dict[str, threading.Lock] = {}
+_path_locks_guard = threading.Lock()
+
+
+def _path_lock(path: Path) -> threading.Lock:
+    key = str(Path(path).resolve())
+    with _path_locks_guard:
+        return _PATH_LOCKS.setdefault(key, threading.Lock())
+
+
+# 每轮轮询都会变的记账字段：只有它们变化时不值得写盘，
+# 内存更新即可（可丢、可重建），状态等实质字段变化才落日志
+_VOLATILE_FIELDS = {"updated_ts", "poll_count", "next_poll_ts", "backoff_sec"}
+
+
+def _substantive(row: Dict[str, str]) -> Dict[str, str]:
+    """剔除易变记账字段后的视图，用于判断这次 upsert 是否值得持久化。"""
+    return {k: v for k, v in row.items() if k not in _VOLATILE_FIELDS}
+
+
+def _csv_fieldnames(rows: List[Dict[str, str]]) -> List[str]:
+    """固定列序在前，行里冒出的未知列稳定地排在末尾。"""
+    extras = sorted(set().union(*(r.keys() for r in rows)) - set(CSV_FIELDS)) if rows else []
+    return CSV_FIELDS + extras
+
+
+def _find_completed(rows: List[Dict[str, str]], project: str, target_name: str, prompt_sha: str) -> Optional[Dict[str, str]]:
+    """两个后端共用的完成品查找：成功终态 + 产物路径非空。"""
+    for row in rows:
+        if (row.get("project") == project
+                and row.get("target_name") == target_name
+                and row.get("status", "").lower() == "succeed"
+                and row.get("output_path")
+                and hashlib.sha1(row.get("prompt", "").encode("utf-8")).hexdigest() == prompt_sha):
+            return dict(row)
+    return None
+
+
+def _write_csv(path: Path, rows: List[Dict[str, str]]) -> None:
+    """csv.writer + 列表行：比 DictWriter 的逐字段 dict 查找省一半开销。"""
+    fieldnames = _csv_fieldnames(rows)
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        w = csv.writer(f)
+        w.writerow(fieldnames)
+        w.writerows([[r.get(k, "") for k in fieldnames] for r in rows])
+
 class TaskCSV:
-    _lock = threading.Lock()  # fine now, no nested locks
+    """
+    任务表：内存 dict 为准，磁盘持久化分两层——
+    每次 upsert 往 .log 追加一行 JSON 增量（O(1) IO），
+    后台按「时间间隔 / 日志体积」把内存快照压实成规范 CSV 并截断日志。
+    启动时先读 CSV 再重放日志，恢复到最后一次 upsert 的状态。
+    """
+
+    _COMPACT_INTERVAL = 60.0           # 秒
+    _COMPACT_LOG_BYTES = 4 * 1024 * 1024
 
     def __init__(self, db_path: Path):
         self.db_path = Path(db_path)
         self.db_path.parent.mkdir(parents=True, exist_ok=True)
-        if not self.db_path.exists():
-            with open(self.db_path, "w", newline="", encoding="utf-8") as f:
-                writer = csv.DictWriter(f, fieldnames=["request_id", "status", "output_path"])
-                writer.writeheader()
+        self.log_path = self.db_path.with_suffix(".log")
+        self._lock = _path_lock(self.db_path)
+        self._rows: Dict[str, Dict[str, str]] = {}
+        # 每个 request_id 一个完成事件：等待方 event.wait()，
+        # 轮询线程写入终态时 set()，不用再反复扫表
+        self._events: Dict[str, threading.Event] = {}
+        # 非终态行的 id 索引：轮询每轮只取活跃子集，不重扫终态大头
+        self._active: set = set()
+        # 变更版本号：每次实际落库的 upsert +1，worker 用它判断
+        # 「上轮快照以来是否还有人写表」来决定能否安全退出
+        self._version = 0
+        self._dirty_count = 0
+        self._closed = False
+        self._load()
+        self._active = {
+            rid for rid, r in self._rows.items()
+            if r.get("status", "") not in TERMINAL
+        }
+        self._log_f = open(self.log_path, "a", encoding="utf-8")
+        # 后台压实：日志只增不改，定期折叠回 CSV，重启重放成本有上限
+        threading.Thread(target=self._compact_loop, daemon=True,
+                         name=f"taskcsv-compact:{self.db_path}").start()
+        atexit.register(self.flush)
+
+    # -------- 磁盘 IO --------
+
+    def _load(self) -> None:
+        # 整文件一次读进内存再解析：CSV + 日志各一次大块 read，
+        # 不走缓冲区小块 IO。终态行也保留完整 dict——完成品查找要用
+        if self.db_path.exists():
+            text = self.db_path.read_text(encoding="utf-8")
+            for row in csv.DictReader(io.StringIO(text)):
+                rid = row.get("request_id")
+                if rid:
+                    self._rows[rid] = row
+        # 重放上次压实后的增量（尾部半行直接丢弃）
+        if self.log_path.exists():
+            for line in self.log_path.read_text(encoding="utf-8").splitlines():
+                try:
+                    delta = json.loads(line)
+                except ValueError:
+                    continue
+                rid = delta.get("request_id")
+                if rid:
+                    self._rows.setdefault(rid, {}).update(delta)
+                self._dirty_count += 1
+
+    def _compact_locked(self) -> None:
+        """快照全量 CSV 并截断日志（调用方须已持有 _lock）。
+        快照覆盖整个文件，前提是本实例独占该路径——由 make_store
+        的按路径单例保证；_lock 按路径共享只是最后一道防线。"""
+        rows = list(self._rows.values())
+        tmp = self.db_path.with_suffix(".csv.tmp")
+        _write_csv(tmp, rows)
+        # os.replace：同目录原子改名，免去 shutil.move 的跨文件系统判断
+        os.replace(tmp, self.db_path)
+        self._log_f.seek(0)
+        self._log_f.truncate()
+        self._dirty_count = 0
+
+    def _compact_loop(self) -> None:
+        last = time.monotonic()
+        while not self._closed:
+            time.sleep(1.0)
+            with self._lock:
+                if not self._dirty_count:
+                    last = time.monotonic()
+                    continue
+                log_big = self._log_f.tell() > self._COMPACT_LOG_BYTES
+                if log_big or time.monotonic() - last >= self._COMPACT_INTERVAL:
+                    self._compact_locked()
+                    last = time.monotonic()
+
+    def flush(self) -> None:
+        """显式压实（退出前/关键节点调用）。"""
+        with self._lock:
+            if self._dirty_count:
+                self._compact_locked()
+
+    def close(self) -> None:
+        self._closed = True
+        self.flush()
+
+    # -------- 读写接口 --------
 
     def get_all(self) -> List[Dict[str, str]]:
-        if not self.db_path.exists():
-            return []
-        with open(self.db_path, "r", encoding="utf-8") as f:
-            reader = csv.DictReader(f)
-            return [row for row in reader]
+        with self._lock:
+            return [dict(r) for r in self._rows.values()]
+
+    def get_active(self) -> List[Dict[str, str]]:
+        """只返回非终态行：O(active) 而非 O(all)。"""
+        with self._lock:
+            return [dict(self._rows[rid]) for rid in self._active]
+
+    def counts(self) -> tuple:
+        """(total, done)，不扫全表。"""
+        with self._lock:
+            total = len(self._rows)
+            return total, total - len(self._active)
+
+    @property
+    def version(self) -> int:
+        with self._lock:
+            return self._version
 
     def upsert(self, row: Dict[str, str]) -> None:
+        rid = row.get("request_id")
+        if not rid:
+            return
         with self._lock:
-            rows = self.get_all()
-            rid = row.get("request_id")
-            updated = False
-            for r in rows:
-                if r.get("request_id") == rid:
-                    r.update(row)
-                    updated = True
-                    break
-            if not updated:
-                rows.append(row)
-
-            fieldnames = sorted(set().union(*(r.keys() for r in rows)))
-            with open(self.db_path, "w", newline="", encoding="utf-8") as f:
-                writer = csv.DictWriter(f, fieldnames=fieldnames)
-                writer.writeheader()
-                writer.writerows(rows)
-                f.flush()
+            existing = self._rows.get(rid)
+            if existing is not None:
+                # 实质内容没变的 upsert（如 Queued→Queued 轮询回写，只有
+                # poll_count/updated_ts 在走表）只更新内存，不往日志刷重复行
+                merged = {**existing, **row}
+                if merged == existing:
+                    return
+                if _substantive(merged) == _substantive(existing):
+                    existing.update(row)
+                    return
+                existing.update(row)
+            else:
+                self._rows[rid] = dict(row)
+            # O(1)：一行增量进日志即算落盘，flush 不 fsync（任务表可重建）
+            self._log_f.write(json.dumps(row, ensure_ascii=False) + "\n")
+            self._log_f.flush()
+            self._dirty_count += 1
+            self._version += 1
+            if self._rows[rid].get("status") in TERMINAL:
+                self._active.discard(rid)
+                self._events.setdefault(rid, threading.Event()).set()
+            else:
+                self._active.add(rid)
 
         print(f"[TaskCSV] ✅ Upserted {rid} (status={row.get('status')})")
 
+    def upsert_many(self, rows: List[Dict[str, str]]) -> None:
+        """批量合并：一次持锁、一次日志 flush 写入整批行。"""
+        if not rows:
+            return
+        with self._lock:
+            lines = []
+            for row in rows:
+                rid = row.get("request_id")
+                if not rid:
+                    continue
+                existing = self._rows.get(rid)
+                if existing is not None:
+                    merged = {**existing, **row}
+                    if merged == existing:
+                        continue  # 无变化，跳过
+                    if _substantive(merged) == _substantive(existing):
+                        existing.update(row)  # 只有记账字段在走，不落盘
+                        continue
+                    existing.update(row)
+                else:
+                    self._rows[rid] = dict(row)
+                lines.append(json.dumps(row, ensure_ascii=False))
+                self._dirty_count += 1
+                self._version += 1
+                if self._rows[rid].get("status") in TERMINAL:
+                    self._active.discard(rid)
+                    self._events.setdefault(rid, threading.Event()).set()
+                else:
+                    self._active.add(rid)
+            if lines:
+                self._log_f.write("\n".join(lines) + "\n")
+                self._log_f.flush()
+        print(f"[TaskCSV] ✅ Upserted {len(rows)} rows (batch)")
+
     def get_task(self, request_id: str) -> Optional[Dict[str, str]]:
         """Get a specific task by request_id"""
-        rows = self.get_all()
-        for row in rows:
-            if row.get("request_id") == request_id:
-                return row
-        return None
+        with self._lock:
+            row = self._rows.get(request_id)
+            return dict(row) if row is not None else None
+
+    def find_completed(self, project: str, target_name: str, prompt_sha: str) -> Optional[Dict[str, str]]:
+        """按 (project, target_name, prompt 哈希) 找已成功且有产物路径的行。"""
+        with self._lock:
+            rows = list(self._rows.values())
+        return _find_completed(rows, project, target_name, prompt_sha)
 
     def wait_for_completion(self, request_id: str, timeout_seconds: int = 300, poll_interval: float = 2.0) -> Optional[Dict[str, str]]:
         """
         Wait for a task to complete (status in TERMINAL states).
         Returns the final task data or None if timeout/not found.
+        事件驱动：终态一写入立即被唤醒，不再按 poll_interval 轮询扫表。
         """
-        from .constants import TERMINAL
-        
-        start_time = time.time()
         print(f"[TaskCSV] Waiting for task {request_id} to complete...")
-        
-        while time.time() - start_time < timeout_seconds:
-            task = self.get_task(request_id)
-            if not task:
-                print(f"[TaskCSV] Task {request_id} not found")
-                return None
-            
-            status = task.get("status", "")
-            if status in TERMINAL:
-                print(f"[TaskCSV] Task {request_id} completed with status: {status}")
-                return task
-            
-            print(f"[TaskCSV] Task {request_id} still {status}, waiting...")
-            time.sleep(poll_interval)
-        
-        print(f"[TaskCSV] Timeout waiting for task {request_id}")
-        return None
+
+        with self._lock:
+            ev = self._events.setdefault(request_id, threading.Event())
+            row = self._rows.get(request_id)
+            if row is not None and row.get("status", "") in TERMINAL:
+                ev.set()
+
+        if not ev.wait(timeout_seconds):
+            print(f"[TaskCSV] Timeout waiting for task {request_id}")
+            return None
+
+        task = self.get_task(request_id)
+        if not task:
+            print(f"[TaskCSV] Task {request_id} not found")
+            return None
+        print(f"[TaskCSV] Task {request_id} completed with status: {task.get('status', '')}")
+        return task
+
+
+# TaskDB 的跨实例共享状态：sqlite 让行数据天然跨实例可见，完成事件
+# 和版本号也得按 db 路径共享——否则挂在 A 实例 wait_for_completion 里的
+# 等待者永远等不到 B 实例（比如 worker）写入终态时的唤醒
+_DB_EVENTS: Dict[str, Dict[str, threading.Event]] = {}
+_DB_VERSIONS: Dict[str, int] = {}
+_db_state_guard = threading.Lock()
+
+
+class TaskDB:
+    """
+    sqlite 后端（WAL 模式）：与 TaskCSV 同接口，按 request_id 主键
+    单行 upsert，写入 O(log N) 且读写互不阻塞。行字段不固定，
+    整行存 JSON；需要 CSV 给人看时用 export_csv() 导一份快照。
+    用 TASK_DB_BACKEND=sqlite 切换（见 make_store）。
+    """
+
+    def __init__(self, db_path: Path):
+        self.db_path = Path(db_path).with_suffix(".sqlite3")
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._tls = threading.local()  # sqlite 连接不能跨线程共享
+        self._lock = _path_lock(self.db_path)
+        self._path_key = str(self.db_path.resolve())
+        with _db_state_guard:
+            self._events = _DB_EVENTS.setdefault(self._path_key, {})
+            _DB_VERSIONS.setdefault(self._path_key, 0)
+        conn = self._conn()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS tasks ("
+            "request_id TEXT PRIMARY KEY, data TEXT NOT NULL)"
+        )
+        conn.commit()
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._tls, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._tls.conn = conn
+        return conn
+
+    # -------- 读写接口（与 TaskCSV 对齐） --------
+
+    def get_all(self) -> List[Dict[str, str]]:
+        cur = self._conn().execute("SELECT data FROM tasks")
+        return [json.loads(d) for (d,) in cur.fetchall()]
+
+    def get_task(self, request_id: str) -> Optional[Dict[str, str]]:
+        cur = self._conn().execute(
+            "SELECT data FROM tasks WHERE request_id = ?", (request_id,)
+        )
+        hit = cur.fetchone()
+        return json.loads(hit[0]) if hit else None
+
+    def find_completed(self, project: str, target_name: str, prompt_sha: str) -> Optional[Dict[str, str]]:
+        """按 (project, target_name, prompt 哈希) 找已成功且有产物路径的行。"""
+        return _find_completed(self.get_all(), project, target_name, prompt_sha)
+
+    def get_active(self) -> List[Dict[str, str]]:
+        """只返回非终态行（json1 在引擎侧过滤）。"""
+        marks = ",".join("?" for _ in TERMINAL)
+        cur = self._conn().execute(
+            f"SELECT data FROM tasks WHERE json_extract(data, '$.status') NOT IN ({marks})",
+            tuple(TERMINAL),
+        )
+        return [json.loads(d) for (d,) in cur.fetchall()]
+
+    def counts(self) -> tuple:
+        """(total, done)。"""
+        marks = ",".join("?" for _ in TERMINAL)
+        cur = self._conn().execute(
+            f"SELECT COUNT(*), SUM(json_extract(data, '$.status') IN ({marks})) FROM tasks",
+            tuple(TERMINAL),
+        )
+        total, done = cur.fetchone()
+        return total or 0, done or 0
+
+    @property
+    def version(self) -> int:
+        with self._lock:
+            return _DB_VERSIONS[self._path_key]
+
+    def _upsert_locked(self, conn: sqlite3.Connection, row: Dict[str, str]) -> bool:
+        """合并单行（调用方须持有 _lock 并负责 commit），返回是否有变化。"""
+        rid = row["request_id"]
+        existing = self.get_task(rid)
+        merged = {**existing, **row} if existing else dict(row)
+        if existing is not None and merged == existing:
+            return False
+        conn.execute(
+            "INSERT INTO tasks(request_id, data) VALUES(?, ?) "
+            "ON CONFLICT(request_id) DO UPDATE SET data = excluded.data",
+            (rid, json.dumps(merged, ensure_ascii=False)),
+        )
+        if merged.get("status") in TERMINAL:
+            self._events.setdefault(rid, threading.Event()).set()
+        _DB_VERSIONS[self._path_key] += 1
+        return True
+
+    def upsert(self, row: Dict[str, str]) -> None:
+        rid = row.get("request_id")
+        if not rid:
+            return
+        with self._lock:
+            conn = self._conn()
+            changed = self._upsert_locked(conn, row)
+            conn.commit()
+        if changed:
+            print(f"[TaskDB] ✅ Upserted {rid} (status={row.get('status')})")
+
+    def upsert_many(self, rows: List[Dict[str, str]]) -> None:
+        if not rows:
+            return
+        with self._lock:
+            conn = self._conn()
+            n = sum(
+                self._upsert_locked(conn, row)
+                for row in rows if row.get("request_id")
+            )
+            conn.commit()
+        print(f"[TaskDB] ✅ Upserted {n} rows (batch)")
+
+    def wait_for_completion(self, request_id: str, timeout_seconds: int = 300, poll_interval: float = 2.0) -> Optional[Dict[str, str]]:
+        """与 TaskCSV 相同的事件驱动等待。"""
+        print(f"[TaskDB] Waiting for task {request_id} to complete...")
+        with self._lock:
+            ev = self._events.setdefault(request_id, threading.Event())
+            row = self.get_task(request_id)
+            if row is not None and row.get("status", "") in TERMINAL:
+                ev.set()
+        if not ev.wait(timeout_seconds):
+            print(f"[TaskDB] Timeout waiting for task {request_id}")
+            return None
+        task = self.get_task(request_id)
+        if not task:
+            print(f"[TaskDB] Task {request_id} not found")
+            return None
+        print(f"[TaskDB] Task {request_id} completed with status: {task.get('status', '')}")
+        return task
+
+    def flush(self) -> None:
+        pass  # 每次 upsert 已随事务提交
+
+    def close(self) -> None:
+        conn = getattr(self._tls, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._tls.conn = None
+
+    def export_csv(self, csv_path: Optional[Path] = None) -> Path:
+        """导出人类可读的 CSV 快照（兼容旧工具链）。"""
+        csv_path = Path(csv_path) if csv_path else self.db_path.with_suffix(".csv")
+        _write_csv(csv_path, self.get_all())
+        return csv_path
+
+
+# 进程级 store 注册表：pipeline 给每个 block 都 new 一个 method 实例，
+# 同一路径必须拿到同一个 store 对象——行、锁、完成事件都在实例里，
+# 各开各的会让 worker 只看得见第一个实例的任务
+_STORES: Dict[tuple, object] = {}
+_stores_guard = threading.Lock()
+
+
+def make_store(db_path: Path):
+    """按 TASK_DB_BACKEND 选择后端（默认 CSV，sqlite 时用 TaskDB）；
+    每个 (后端, 绝对路径) 全进程只构造一次，后续调用返回同一实例。"""
+    backend = os.getenv("TASK_DB_BACKEND", "csv").lower()
+    key = (backend, str(Path(db_path).resolve()))
+    with _stores_guard:
+        store = _STORES.get(key)
+        if store is None:
+            store = TaskDB(db_path) if backend == "sqlite" else TaskCSV(db_path)
+            _STORES[key] = store
+        return store
@@ -1,16 +1,40 @@
 #!/usr/bin/env python3
 from __future__ import annotations
 import subprocess
+from collections import deque
 from pathlib import Path
 from typing import Union
 
+# meta.json 落盘：有 orjson 走 orjson（C 层序列化 + 一次 write），
+# 没有退回标准库，格式同样是 2 空格缩进的 UTF-8
+try:
+    import orjson
+
+    def _dump_json(path: Union[str, Path], obj) -> None:
+        Path(path).write_bytes(orjson.dumps(obj, option=orjson.OPT_INDENT_2))
+except ImportError:
+    import json
+
+    def _dump_json(path: Union[str, Path], obj) -> None:
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(obj, f, ensure_ascii=False, indent=2)
+
 def _run_ffmpeg(cmd: list[str]) -> bool:
     """Execute FFmpeg command and print diagnostic output on failure."""
     print(f"[ffmpeg] {' '.join(cmd)}")
-    proc = subprocess.run(cmd, capture_output=True, text=True)
-    if proc.returncode != 0:
+    # 流式消费 stderr 进 200 行环形缓冲：长转码不会把整份日志
+    # 堆在内存里，-nostats 顺带省掉每帧进度行的管道流量
+    proc = subprocess.Popen(
+        [cmd[0], "-nostats", "-loglevel", "error", *cmd[1:]],
+        stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True,
+    )
+    tail: deque[str] = deque(maxlen=200)
+    assert proc.stderr is not None
+    for line in proc.stderr:
+        tail.append(line)
+    if proc.wait() != 0:
         print("[ffmpeg] ❌ FFmpeg failed:")
-        print(proc.stderr)
+        print("".join(tail))
         return False
     return True
 
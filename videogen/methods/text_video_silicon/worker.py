@@ -1,5 +1,6 @@
 from __future__ import annotations
-import json, time, threading
+import os, time, threading
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from typing import Dict
 
@@ -8,20 +9,29 @@ from videogen.methods.text_video_silicon.constants import (
     STATUS_SUCCEED, STATUS_ERROR, NON_TERMINAL, TERMINAL,
 )
 from videogen.methods.text_video_silicon.sf_api import check_status, download_to
-from videogen.methods.text_video_silicon.store import TaskCSV
-from videogen.methods.text_video_silicon.utils import resize_video_duration
+from videogen.methods.text_video_silicon.store import TaskCSV, make_store
+from videogen.methods.text_video_silicon.utils import _dump_json, resize_video_duration
 
 _worker_started: Dict[str, bool] = {}
 _worker_guard = threading.Lock()
 
 
 def start_background_worker(store: TaskCSV) -> None:
-    """每个 CSV（以绝对路径为 key）只启动一次线程"""
+    """每个 CSV（以绝对路径为 key）同时只跑一个线程；
+    _loop 正常退出后清掉标记，后续提交能再拉起新 worker。"""
     key = str(store.db_path.resolve())
+
+    def _run() -> None:
+        try:
+            _loop(store)
+        finally:
+            with _worker_guard:
+                _worker_started.pop(key, None)
+
     with _worker_guard:
         if _worker_started.get(key):
             return
-        th = threading.Thread(target=_loop, args=(store,), daemon=True, name=f"sf-poller:{key}")
+        th = threading.Thread(target=_run, daemon=True, name=f"sf-poller:{key}")
         th.start()
         _worker_started[key] = True
 
@@ -40,21 +50,40 @@ def check_and_resize_missing_final_videos(store: TaskCSV) -> None:
     rows = store.get_all()
     fixed_count = 0
 
+    # 每个项目目录只 scandir 一次拿文件名集合，按名字做集合成员判断，
+    # 代替每行两次 Path.exists() 的 stat；Path(workdir) 同理只构造一次
+    workdirs: Dict[str, Path] = {}
+    dir_names: Dict[Path, set] = {}
+
+    def _names(project_dir: Path) -> set:
+        names = dir_names.get(project_dir)
+        if names is None:
+            try:
+                with os.scandir(project_dir) as it:
+                    names = {e.name for e in it}
+            except OSError:
+                names = set()
+            dir_names[project_dir] = names
+        return names
+
     for row in rows:
         project = row.get("project")
         target_name = row.get("target_name")
 
-        workdir = Path(row["workdir"])
+        wd = row["workdir"]
+        workdir = workdirs.setdefault(wd, Path(wd))
         project_dir = workdir / "project" / project
+        names = _names(project_dir)
         raw_mp4 = project_dir / f"{target_name}_raw.mp4"
         final_mp4 = project_dir / f"{target_name}.mp4"
 
-        if raw_mp4.exists() and not final_mp4.exists():
+        if raw_mp4.name in names and final_mp4.name not in names:
             target_dur = float(row.get("duration") or 5.0)
             print(f"[Repair] Found raw-only video: {raw_mp4.name} → resizing to {target_dur:.2f}s")
 
             new_dur = resize_video_duration(raw_mp4, final_mp4, target_dur)
             if new_dur > 0:
+                names.add(final_mp4.name)  # 同目录后续行看到最新状态
                 # row["duration"] = f"{new_dur:.3f}"
                 row["output_path"] = str(final_mp4)
                 row["status"] = STATUS_SUCCEED
@@ -70,8 +99,7 @@ def check_and_resize_missing_final_videos(store: TaskCSV) -> None:
                     "fixed_at": time.time(),
                 }
                 meta_path = final_mp4.with_suffix(".meta.json")
-                with open(meta_path, "w", encoding="utf-8") as f:
-                    json.dump(meta, f, ensure_ascii=False, indent=2)
+                _dump_json(meta_path, meta)
                 print(f"[Repair] ✅ Repaired and saved {final_mp4.name}")
                 fixed_count += 1
             else:
@@ -87,152 +115,181 @@ def check_and_resize_missing_final_videos(store: TaskCSV) -> None:
 # 🔁 Main worker loop
 # =====================================================
 
+_BACKOFF_MAX_SEC = 60.0
+
+
+def _next_poll(row: Dict[str, str], now: float, status_changed: bool) -> None:
+    """
+    每任务指数退避：状态没变就把下次查询间隔翻倍（封顶 60s），
+    一有变化立刻回到基础间隔。新任务查得勤、老任务不刷接口。
+    """
+    if status_changed:
+        backoff = float(POLL_INTERVAL_SEC)
+    else:
+        backoff = min(float(row.get("backoff_sec") or POLL_INTERVAL_SEC) * 2, _BACKOFF_MAX_SEC)
+    row["backoff_sec"] = f"{backoff:.1f}"
+    row["next_poll_ts"] = f"{now + backoff:.1f}"
+
+
+def _poll_one(row: Dict[str, str], now: float) -> Dict[str, str] | None:
+    """
+    单任务查询 + 成功路径的下载/重整（不碰 store——返回更新后的行，
+    由 _loop 统一回写；返回 None 表示本轮无需更新）。
+    """
+    status = row.get("status", "")
+    rid = row.get("request_id", "?")
+    poll_cnt = int(row.get("poll_count") or "0")
+
+    print(f"  → [Task {rid}] status={status} poll={poll_cnt}")
+
+    if poll_cnt >= MAX_POLLS_PER_TASK:
+        print(f"  [!] Task {rid} timed out")
+        row.update({
+            "status": STATUS_ERROR,
+            "error": "Timeout",
+            "updated_ts": str(now),
+            "poll_count": str(poll_cnt),
+        })
+        return row
+
+    try:
+        resp = check_status(rid)
+    except Exception as e:
+        print(f"  [x] check_status failed: {e}")
+        return None
+
+    new_status = resp.get("status") or STATUS_ERROR
+
+    # === 成功 ===
+    if new_status == STATUS_SUCCEED:
+        videos = (resp.get("results") or {}).get("videos") or []
+        url = videos[0].get("url") if videos else None
+        if not url:
+            row.update({
+                "status": STATUS_ERROR,
+                "error": "Succeed but no video url",
+                "updated_ts": str(now),
+                "poll_count": str(poll_cnt + 1),
+            })
+            return row
+
+        print(f"  [✓] Task {rid} succeeded, downloading video from {url}")
+        workdir = Path(row["workdir"])
+        project_dir = workdir / "project" / row["project"]
+        final_mp4 = project_dir / f"{row['target_name']}.mp4"
+        raw_mp4 = project_dir / f"{row['target_name']}_raw.mp4"
+
+        try:
+            # Download raw (always keep this)
+            download_to(url, raw_mp4)
+            print(f"      → Saved raw file: {raw_mp4}")
+
+            # Resize to target duration, but keep raw
+            target_dur = float(row.get("duration") or 5.0)
+            new_dur = resize_video_duration(raw_mp4, final_mp4, target_dur)
+
+            if new_dur > 0:
+                # row["duration"] = f"{new_dur:.3f}"
+                print(f"      → Resized to {new_dur:.2f}s → {final_mp4.name}")
+            else:
+                print(f"      ⚠️ Resize failed, keeping raw as source only (no deletion).")
+
+            row.update({
+                "status": STATUS_SUCCEED,
+                "source_url": url,
+                "output_path": str(final_mp4 if final_mp4.exists() else raw_mp4),
+                "updated_ts": str(now),
+                "error": "",
+                "poll_count": str(poll_cnt + 1),
+            })
+
+            meta = {
+                "request_id": rid,
+                "model": row.get("model"),
+                "prompt": row.get("prompt"),
+                "source_url": url,
+                "created": float(row.get("created_ts") or now),
+                "finished": now,
+                "duration": row.get("duration"),
+            }
+            meta_path = final_mp4.with_suffix(".meta.json")
+            _dump_json(meta_path, meta)
+            print(f"      → Meta saved: {meta_path}")
+
+        except Exception as e:
+            print(f"  [x] Download or resize error for {rid}: {e}")
+            row.update({
+                "status": STATUS_ERROR,
+                "error": f"Download/Resize error: {e}",
+                "updated_ts": str(now),
+                "poll_count": str(poll_cnt + 1),
+            })
+        return row
+
+    if new_status in NON_TERMINAL:
+        _next_poll(row, now, status_changed=new_status != status)
+        row.update({
+            "status": new_status,
+            "updated_ts": str(now),
+            "poll_count": str(poll_cnt + 1),
+        })
+        return row
+
+    row.update({
+        "status": new_status,
+        "error": resp.get("error", ""),
+        "updated_ts": str(now),
+        "poll_count": str(poll_cnt + 1),
+    })
+    return row
+
+
 def _loop(store: TaskCSV) -> None:
     print(f"[Worker] Polling loop started for {store.db_path}")
-    idle_rounds = 0
+    # 退出判据：全部终态 + 两次观察之间 store 版本号没动过
+    # （= 没有新提交在路上），不用再白等 3 个空轮询周期
+    last_version = -1
 
     while True:
-        rows = store.get_all()
+        total, done = store.counts()
+        active = store.get_active()
         now = time.time()
 
-        if not rows:
+        if not total:
             print("[Worker] No tasks in CSV. Sleeping...")
             time.sleep(POLL_INTERVAL_SEC)
             continue
 
-        total = len(rows)
-        done = sum(1 for r in rows if r.get("status") in TERMINAL)
         print(f"[Worker] Checking {total} tasks ({done} done, {total - done} active)...")
 
         if done == total:
-            idle_rounds += 1
-            print(f"[Worker] All tasks complete ({idle_rounds}/3)...")
-            if idle_rounds >= 3:
+            version = store.version
+            if version == last_version:
                 print("[Worker] ✅ All tasks finished. Checking for repairs before exit...")
                 check_and_resize_missing_final_videos(store)
                 break
-            time.sleep(POLL_INTERVAL_SEC)
+            # 版本变过：重新快照后立刻复查（新提交会把 done<total 拉回主路径）
+            last_version = version
             continue
-        else:
-            idle_rounds = 0
-
-        for row in rows:
-            status = row.get("status", "")
-            rid = row.get("request_id", "?")
-            poll_cnt = int(row.get("poll_count") or "0")
-
-            if status in TERMINAL:
-                continue
-
-            print(f"  → [Task {rid}] status={status} poll={poll_cnt}")
-
-            if poll_cnt >= MAX_POLLS_PER_TASK:
-                print(f"  [!] Task {rid} timed out")
-                row.update({
-                    "status": STATUS_ERROR,
-                    "error": "Timeout",
-                    "updated_ts": str(now),
-                    "poll_count": str(poll_cnt),
-                })
-                store.upsert(row)
-                continue
+        last_version = -1
 
-            try:
-                resp = check_status(rid)
-            except Exception as e:
-                print(f"  [x] check_status failed: {e}")
-                continue
-
-            new_status = resp.get("status") or STATUS_ERROR
-
-            # === 成功 ===
-            if new_status == STATUS_SUCCEED:
-                videos = (resp.get("results") or {}).get("videos") or []
-                url = videos[0].get("url") if videos else None
-                if not url:
-                    row.update({
-                        "status": STATUS_ERROR,
-                        "error": "Succeed but no video url",
-                        "updated_ts": str(now),
-                        "poll_count": str(poll_cnt + 1),
-                    })
-                    store.upsert(row)
-                    continue
-
-                print(f"  [✓] Task {rid} succeeded, downloading video from {url}")
-                workdir = Path(row["workdir"])
-                project_dir = workdir / "project" / row["project"]
-                final_mp4 = project_dir / f"{row['target_name']}.mp4"
-                raw_mp4 = project_dir / f"{row['target_name']}_raw.mp4"
-
-                try:
-                    # Download raw (always keep this)
-                    download_to(url, raw_mp4)
-                    print(f"      → Saved raw file: {raw_mp4}")
-
-                    # Resize to target duration, but keep raw
-                    target_dur = float(row.get("duration") or 5.0)
-                    new_dur = resize_video_duration(raw_mp4, final_mp4, target_dur)
-
-                    if new_dur > 0:
-                        # row["duration"] = f"{new_dur:.3f}"
-                        print(f"      → Resized to {new_dur:.2f}s → {final_mp4.name}")
-                    else:
-                        print(f"      ⚠️ Resize failed, keeping raw as source only (no deletion).")
-
-                    row.update({
-                        "status": STATUS_SUCCEED,
-                        "source_url": url,
-                        "output_path": str(final_mp4 if final_mp4.exists() else raw_mp4),
-                        "updated_ts": str(now),
-                        "error": "",
-                        "poll_count": str(poll_cnt + 1),
-                    })
-                    store.upsert(row)
-
-                    meta = {
-                        "request_id": rid,
-                        "model": row.get("model"),
-                        "prompt": row.get("prompt"),
-                        "source_url": url,
-                        "created": float(row.get("created_ts") or now),
-                        "finished": now,
-                        "duration": row.get("duration"),
-                    }
-                    meta_path = final_mp4.with_suffix(".meta.json")
-                    with open(meta_path, "w", encoding="utf-8") as f:
-                        json.dump(meta, f, ensure_ascii=False, indent=2)
-                    print(f"      → Meta saved: {meta_path}")
-
-                except Exception as e:
-                    print(f"  [x] Download or resize error for {rid}: {e}")
-                    row.update({
-                        "status": STATUS_ERROR,
-                        "error": f"Download/Resize error: {e}",
-                        "updated_ts": str(now),
-                        "poll_count": str(poll_cnt + 1),
-                    })
-                    store.upsert(row)
-
-            elif new_status in NON_TERMINAL:
-                row.update({
-                    "status": new_status,
-                    "updated_ts": str(now),
-                    "poll_count": str(poll_cnt + 1),
-                })
-                store.upsert(row)
+        # 到点该查的任务：纯网络等待，线程池并发扇出，一轮 ~1 个 RTT
+        due = [row for row in active if float(row.get("next_poll_ts") or 0) <= now]
+        if due:
+            with ThreadPoolExecutor(max_workers=min(16, len(due))) as ex:
+                updates = list(ex.map(lambda r: _poll_one(r, now), due))
+            # 一轮的更新合并成一次批量回写
+            store.upsert_many([u for u in updates if u is not None])
 
-            else:
-                row.update({
-                    "status": new_status,
-                    "error": resp.get("error", ""),
-                    "updated_ts": str(now),
-                    "poll_count": str(poll_cnt + 1),
-                })
-                store.upsert(row)
-
-        print(f"[Worker] Sleep {POLL_INTERVAL_SEC}s...\n")
-        time.sleep(POLL_INTERVAL_SEC)
+        # 睡到最近的 next_poll_ts 为止（上限一个基础间隔，下限 0.5s 防忙转）
+        now = time.time()
+        pending_ts = [float(r.get("next_poll_ts") or 0) for r in store.get_active()]
+        sleep_sec = min(
+            POLL_INTERVAL_SEC,
+            max(0.5, min(pending_ts) - now) if pending_ts else POLL_INTERVAL_SEC,
+        )
+        print(f"[Worker] Sleep {sleep_sec:.1f}s...\n")
+        time.sleep(sleep_sec)
 
 
 # =====================================================
@@ -245,7 +302,7 @@ def main() -> None:
         print(f"[!] CSV not found at {db_path}")
         return
 
-    store = TaskCSV(db_path)
+    store = make_store(db_path)
 
     import sys
     if len(sys.argv) > 1 and sys.argv[1] == "--repair":
@@ -2,8 +2,10 @@
 from __future__ import annotations
 import os, json, re, subprocess
 from pathlib import Path
-from collections import Counter
+from collections import Counter, deque
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
+from functools import lru_cache
 from typing import Dict, List, Tuple, Optional
 from dacite import from_dict
 from dotenv import load_dotenv
@@ -20,17 +22,32 @@ PIX_FMT = "yuv420p"
 # ========== 辅助函数 ==========
 def run(cmd: List[str]) -> bool:
     print(f"[ffmpeg] {' '.join(cmd)}")
-    proc = subprocess.run(cmd, capture_output=True, text=True)
-    if proc.returncode != 0:
-        print(proc.stderr[-400:])
+    # stderr 边读边丢进环形缓冲（200 行封顶），不整段攒在内存；
+    # -nostats 去掉每帧进度行，失败时只回放缓冲尾部
+    proc = subprocess.Popen(
+        [cmd[0], "-nostats", "-loglevel", "error", *cmd[1:]],
+        stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True,
+    )
+    tail: deque = deque(maxlen=200)
+    assert proc.stderr is not None
+    for line in proc.stderr:
+        tail.append(line)
+    if proc.wait() != 0:
+        print("".join(tail))
         return False
     return True
 
-def ffprobe(path: Path) -> Dict:
-    cmd = ["ffprobe","-v","error","-show_streams","-show_format","-print_format","json",str(path)]
+@lru_cache(maxsize=256)
+def _probe_cached(path: str) -> Dict:
+    cmd = ["ffprobe","-v","error","-show_streams","-show_format","-print_format","json",path]
     out = subprocess.check_output(cmd, text=True)
     return json.loads(out)
 
+def ffprobe(path: Path) -> Dict:
+    # 同一文件在一次 pipeline 里会被探测多次（规格、时长、字幕），
+    # 以绝对路径为 key 缓存，每个文件只起一次 ffprobe 进程
+    return _probe_cached(str(path.resolve()))
+
 def parse_fps(s: str) -> float:
     if not s or s=="0/0": return 30
     n,d = map(float, s.split("/")) if "/" in s else (float(s),1)
@@ -60,9 +77,18 @@ def ensure_muxed(project_dir: Path, idx: int) -> Optional[Path]:
     audio = project_dir / f"audio/L{idx}.wav"
     if video.exists() and audio.exists():
         print(f"[mux] Generating L{idx}_muxed.mp4 ...")
+        # 音轨已是 aac/44100/立体声时直接流拷贝，整个 mux 降为纯 remux
+        try:
+            a = next(s for s in ffprobe(audio)["streams"] if s["codec_type"]=="audio")
+            copy_ok = (a.get("codec_name")=="aac"
+                       and str(a.get("sample_rate"))==AUDIO_RATE
+                       and int(a.get("channels") or 0)==2)
+        except (StopIteration, subprocess.CalledProcessError):
+            copy_ok = False
+        acodec = ["-c:a","copy"] if copy_ok else ["-c:a","aac"]
         ok = run([
             "ffmpeg","-y","-i",str(video),"-i",str(audio),
-            "-c:v","copy","-c:a","aac","-shortest",str(mux)
+            "-c:v","copy",*acodec,"-shortest",str(mux)
         ])
         return mux if ok else None
     print(f"[mux] ⚠️ Missing L{idx}.mp4 or .wav, skipping")
@@ -129,6 +155,44 @@ def generate_srt_from_json(raw: Dict, clips: List[Path], out_path: Path) -> None
 
 
 # ========== 阶段 5：拼接 ==========
+def concat_one_pass(clips: List[Path], infos: List[ClipInfo], out: Path,
+                    w: int, h: int, fps: int) -> bool:
+    """
+    单次 ffmpeg 调用完成 normalize + 拼接：所有 muxed 片段一起进
+    filter_complex（每路 scale/pad/fps 后 concat），省掉 N 个中间
+    normalize 文件和 N+1 次进程/编解码器初始化。
+    要求每路都有音轨；不满足时由调用方走旧的逐片路径。
+    """
+    if not all(i.has_audio for i in infos):
+        return False
+
+    args: List[str] = ["ffmpeg", "-y", "-fflags", "+genpts", "-avoid_negative_ts", "make_zero"]
+    for c in clips:
+        args += ["-i", str(c)]
+
+    parts = []
+    for i in range(len(clips)):
+        parts.append(
+            f"[{i}:v]scale={w}:{h}:force_original_aspect_ratio=decrease,"
+            f"pad={w}:{h}:(ow-iw)/2:(oh-ih)/2:color=black,fps={fps},format={PIX_FMT}[v{i}];"
+            f"[{i}:a]aresample={AUDIO_RATE},aformat=channel_layouts=stereo[a{i}]"
+        )
+    chain = "".join(f"[v{i}][a{i}]" for i in range(len(clips)))
+    parts.append(f"{chain}concat=n={len(clips)}:v=1:a=1[v][a]")
+
+    args += [
+        "-filter_complex", ";".join(parts),
+        "-map", "[v]", "-map", "[a]",
+        "-c:v", "libx264", "-preset", PRESET, "-crf", CRF,
+        "-c:a", "aac", "-ar", AUDIO_RATE, "-b:a", AUDIO_BR,
+        "-pix_fmt", PIX_FMT, "-movflags", "+faststart",
+        str(out),
+    ]
+    ok = run(args)
+    if ok: print(f"[concat] ✅ {out} (single pass)")
+    return ok
+
+
 def concat_videos(files: List[Path], out: Path)->bool:
     tmp = out.parent / "concat_list.txt"
     tmp.write_text("\n".join(f"file '{f.resolve()}'" for f in files),encoding="utf-8")
@@ -145,28 +209,33 @@ def concat_pipeline(project_name:str):
     muxed_dir=work/"muxed"; muxed_dir.mkdir(exist_ok=True)
     norm_dir=work/"norm"; norm_dir.mkdir(exist_ok=True)
 
-    clips=[]
-    for i,_ in enumerate(raw["script"],start=1):
-        p=ensure_muxed(project_dir,i)
-        if p: clips.append(p)
+    # 逐片 mux 互不依赖，线程池并发跑 ffmpeg 子进程；map 保证结果同序
+    idxs=list(range(1,len(raw["script"])+1))
+    with ThreadPoolExecutor(max_workers=min(8, os.cpu_count() or 4)) as ex:
+        clips=[p for p in ex.map(lambda i: ensure_muxed(project_dir,i), idxs) if p]
     if not clips: raise SystemExit("❌ no muxed clips found")
 
     infos=[get_clip_info(p) for p in clips]
     w,h,fps=choose_target(infos)
     print(f"[spec] Target {w}x{h}@{fps}fps")
 
-    norm=[]
-    for c in clips:
-        out=norm_dir/f"{c.stem}_norm.mp4"
-        if normalize_clip(c,out,w,h,fps): norm.append(out)
-    if not norm: raise SystemExit("❌ normalize failed")
-
     final=work/"final.mp4"
-    if not concat_videos(norm,final):
-        raise SystemExit("concat failed")
+    srt_clips=clips
+    if not concat_one_pass(clips,infos,final,w,h,fps):
+        # 回退：逐片 normalize 再 concat（例如有片段缺音轨时）
+        print("[concat] ⚠️ single pass unavailable, falling back to per-clip normalize")
+        def _norm_one(c: Path) -> Optional[Path]:
+            out=norm_dir/f"{c.stem}_norm.mp4"
+            return out if normalize_clip(c,out,w,h,fps) else None
+        with ThreadPoolExecutor(max_workers=min(8, os.cpu_count() or 4)) as ex:
+            norm=[p for p in ex.map(_norm_one, clips) if p]
+        if not norm: raise SystemExit("❌ normalize failed")
+        if not concat_videos(norm,final):
+            raise SystemExit("concat failed")
+        srt_clips=norm
 
     out_srt = work / "full.srt"
-    generate_srt_from_json(raw, norm, out_srt)
+    generate_srt_from_json(raw, srt_clips, out_srt)
     print("✅ pipeline complete!")
 
     # ====== 阶段 6：字幕硬烧录 ======
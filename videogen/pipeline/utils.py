@@ -2,6 +2,16 @@ import json
 from pathlib import Path
 from typing import Any, Dict
 
+# 有 orjson 用 orjson 序列化（输出同为 2 空格缩进 UTF-8），没有退回标准库
+try:
+    import orjson
+
+    def _dumps_indented(data: Dict[str, Any]) -> bytes:
+        return orjson.dumps(data, option=orjson.OPT_INDENT_2)
+except ImportError:
+    def _dumps_indented(data: Dict[str, Any]) -> bytes:
+        return json.dumps(data, ensure_ascii=False, indent=2).encode("utf-8")
+
 def read_json(path: Path) -> Dict[str, Any]:
     if not path.exists():
         raise FileNotFoundError(f"Input JSON not found: {path}")
@@ -11,6 +21,5 @@ def read_json(path: Path) -> Dict[str, Any]:
 def write_json(path: Path, data: Dict[str, Any]) -> None:
     path.parent.mkdir(parents=True, exist_ok=True)
     tmp_path = path.with_suffix(".tmp")
-    with open(tmp_path, "w", encoding="utf-8") as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
+    tmp_path.write_bytes(_dumps_indented(data))
     tmp_path.replace(path)
@@ -51,7 +51,7 @@ def decide_generation_method(
         max_tokens=20,
     )
 
-    method = res["content"].strip().lower()
+    method = res.content.strip().lower()
     # normalize output
     if "react" in method:
         return "react_animation"
@@ -1,11 +1,18 @@
 # videogen/utils/js_syntax_checker.py
 from __future__ import annotations
+import hashlib
 import subprocess
 import tempfile
 import shutil
+from functools import lru_cache
 from pathlib import Path
 from typing import Tuple
 
+# 同一段 JSX 在重试/重跑间反复出现：按内容 hash 记住 esbuild 的判定，
+# 命中时省掉整个子进程往返。只缓存确定性结果（超时/环境问题不缓存）。
+_VERDICT_CACHE: dict[str, Tuple[bool, str, str]] = {}
+_VERDICT_CACHE_MAX = 256
+
 # Public API ==================================================================
 
 def check_jsx_syntax(
@@ -29,10 +36,18 @@ def check_jsx_syntax(
     if not jsx:
         return False, "JSX 为空", "fallback"
 
+    digest = hashlib.sha256(jsx.encode("utf-8")).hexdigest()
+    cached = _VERDICT_CACHE.get(digest)
+    if cached is not None:
+        return cached
+
     # 先试 esbuild
-    if _has_cmd("npx"):
+    if _esbuild_cmd() is not None:
         ok, msg = _check_with_esbuild(jsx, filename_hint=filename_hint, timeout_sec=timeout_sec)
         if ok is not None:  # None 表示 esbuild 不可用/失败为环境问题
+            if len(_VERDICT_CACHE) >= _VERDICT_CACHE_MAX:
+                _VERDICT_CACHE.clear()
+            _VERDICT_CACHE[digest] = (ok, msg, "esbuild")
             return ok, msg, "esbuild"
 
     # 退化检查（不依赖外部工具）
@@ -45,6 +60,19 @@ def check_jsx_syntax(
 def _has_cmd(cmd: str) -> bool:
     return shutil.which(cmd) is not None
 
+@lru_cache(maxsize=1)
+def _esbuild_cmd() -> tuple[str, ...] | None:
+    """
+    解析一次 esbuild 的调用方式并缓存：
+    PATH 上有 esbuild 二进制就直接调（省掉每次 npx 的解析/启动开销），
+    否则退回 `npx --yes esbuild`，都没有返回 None。
+    """
+    if _has_cmd("esbuild"):
+        return ("esbuild",)
+    if _has_cmd("npx"):
+        return ("npx", "--yes", "esbuild")
+    return None
+
 def _check_with_esbuild(
     jsx_text: str,
     *,
@@ -66,7 +94,7 @@ def _check_with_esbuild(
             out_path = Path(f_out.name)
 
         args = [
-            "npx", "--yes", "esbuild",
+            *(_esbuild_cmd() or ("esbuild",)),
             str(in_path),
             # 不要 --loader=jsx/tsx（这会触发你遇到的报错）
             "--jsx=transform",